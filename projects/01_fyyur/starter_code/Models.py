@@ -1,15 +1,80 @@
-from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from routing import RoutingSQLAlchemy
 
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
+
+
+class utc_now(FunctionElement):
+    """ The current UTC time as a naive timestamp, for server defaults. """
+    type = db.DateTime()
+    inherit_cache = True
+
+
+@compiles(utc_now)
+def _utc_now(element, compiler, **kw):
+    # SQLite's CURRENT_TIMESTAMP is already UTC
+    return 'CURRENT_TIMESTAMP'
+
+
+@compiles(utc_now, 'postgresql')
+def _utc_now_postgresql(element, compiler, **kw):
+    # now() is in the session time zone
+    return "timezone('utc', now())"
 
 
 # ----------------------------------------------------------------------------#
 # Models.
 # ----------------------------------------------------------------------------#
 
+venue_genres = db.Table(
+    'Venue_Genre',
+    db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True),
+    # serves /venues?genre=
+    db.Index('ix_Venue_Genre_genre_id_venue_id', 'genre_id', 'venue_id'))
+
+artist_genres = db.Table(
+    'Artist_Genre',
+    db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True),
+    # serves /artists?genre=
+    db.Index('ix_Artist_Genre_genre_id_artist_id', 'genre_id', 'artist_id'))
+
+
+class Genre(db.Model):
+    __tablename__ = 'Genre'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    @classmethod
+    def lookup(cls, names):
+        """ Genre rows for names, in order, creating the missing ones. """
+        names = list(dict.fromkeys(names))
+        genres = {genre.name: genre for genre in cls.query.filter(cls.name.in_(names))}
+        for name in names:
+            if name not in genres:
+                # added right away so the next lookup's autoflush finds it
+                genres[name] = cls(name=name)
+                db.session.add(genres[name])
+        return [genres[name] for name in names]
+
+
 # parent
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    __table_args__ = (
+        # /venues groups and orders by area; soft-deleted venues are never listed
+        db.Index('ix_Venue_city_state_name', 'city', 'state', 'name',
+                 postgresql_where=db.text('deleted_at IS NULL'),
+                 sqlite_where=db.text('deleted_at IS NULL')),
+        # bounding box prefilter of venues near a point (see geo.py)
+        db.Index('ix_Venue_latitude_longitude', 'latitude', 'longitude',
+                 postgresql_where=db.text('deleted_at IS NULL'),
+                 sqlite_where=db.text('deleted_at IS NULL')),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
@@ -17,14 +82,54 @@ class Venue(db.Model):
     state = db.Column(db.String(120))
     address = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.PickleType)
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     website = db.Column(db.String(120))
     seeking_talent = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(120))
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # optimistic locking: an UPDATE from a stale row matches nothing
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # UTC; detail page validators (also bumped by show counter updates)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=utc_now())
+    # set when the venue is deleted; its shows are purged in the background
+    # (see deletion.py) and the row itself goes last
+    deleted_at = db.Column(db.DateTime, index=True)
+    # the city's centroid (see geo.py)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
 
     shows = db.relationship('Show_Table', backref='venues', lazy='select')
+    genre_list = db.relationship('Genre', secondary=venue_genres, order_by='Genre.name', lazy='selectin')
+
+    __mapper_args__ = {'version_id_col': version}
+
+    @property
+    def genres(self):
+        return [genre.name for genre in self.genre_list]
+
+    @genres.setter
+    def genres(self, names):
+        self.genre_list = Genre.lookup(names)
+
+
+def visible(model):
+    """ Filter criterion for the rows of model that aren't soft-deleted. """
+    deleted_at = getattr(model, 'deleted_at', None)
+    return deleted_at.is_(None) if deleted_at is not None else db.true()
+
+
+# progress of a soft-deleted venue's purge; outlives the Venue row
+class Venue_Deletion(db.Model):
+    __tablename__ = 'Venue_Deletion'
+
+    venue_id = db.Column(db.Integer, primary_key=True)
+    shows_total = db.Column(db.Integer, nullable=False, default=0)
+    shows_deleted = db.Column(db.Integer, nullable=False, default=0)
+    requested_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
 
 
 # parent
@@ -32,24 +137,88 @@ class Artist(db.Model):
     __tablename__ = 'Artist'
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String)
+    name = db.Column(db.String, index=True)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.PickleType)
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     website = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(120))
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # optimistic locking: an UPDATE from a stale row matches nothing
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # UTC; detail page validators (also bumped by show counter updates)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=utc_now())
     shows = db.relationship('Show_Table', backref='artists', lazy='select')
+    genre_list = db.relationship('Genre', secondary=artist_genres, order_by='Genre.name', lazy='selectin')
+
+    __mapper_args__ = {'version_id_col': version}
+
+    @property
+    def genres(self):
+        return [genre.name for genre in self.genre_list]
+
+    @genres.setter
+    def genres(self, names):
+        self.genre_list = Genre.lookup(names)
 
 
 # child
 class Show_Table(db.Model):
     __tablename__ = 'Show_Table'
+    __table_args__ = (
+        # keyset pagination of /shows
+        db.Index('ix_Show_Table_start_time_id', 'start_time', 'id'),
+        # shows of one venue / artist, split by start_time
+        db.Index('ix_Show_Table_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_Show_Table_artist_id_start_time', 'artist_id', 'start_time'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
     artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
     start_time = db.Column(db.DateTime)
+    # which counter this show is currently tallied in (see counters.py)
+    is_upcoming = db.Column(db.Boolean, index=True)
+    # UTC; calendar ETags and iCalendar DTSTAMPs
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=utc_now())
+
+
+# precomputed top matches of each artist / venue (see recommendations.py)
+class Artist_Suggestion(db.Model):
+    __tablename__ = 'Artist_Suggestion'
+
+    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), nullable=False, index=True)
+    score = db.Column(db.Float, nullable=False)
+    # UTC; when this artist's list last changed
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class Venue_Suggestion(db.Model):
+    __tablename__ = 'Venue_Suggestion'
+
+    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), nullable=False, index=True)
+    score = db.Column(db.Float, nullable=False)
+    # UTC; when this venue's list last changed
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+# one row per suggestion refresh; the next incremental refresh picks up the
+# profiles updated since the last one started
+class Suggestion_Refresh(db.Model):
+    __tablename__ = 'Suggestion_Refresh'
+
+    id = db.Column(db.Integer, primary_key=True)
+    full = db.Column(db.Boolean, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False)
+    finished_at = db.Column(db.DateTime)
+    lists_rewritten = db.Column(db.Integer)
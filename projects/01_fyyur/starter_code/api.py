@@ -0,0 +1,228 @@
+import json
+from collections import namedtuple
+from datetime import datetime
+from flask import Blueprint, Response, request
+from Models import db, Venue, Artist, Show_Table, Genre, venue_genres, artist_genres, visible
+from show_listing import encode_cursor, decode_cursor
+
+try:
+    import orjson
+except ImportError:  # pinned in requirements.txt; the stdlib encoder is a fallback
+    orjson = None
+
+# ----------------------------------------------------------------------------#
+# JSON API, version 1.
+#
+# /api/v1/venues, /api/v1/artists and /api/v1/shows, one page at a time:
+#   fields=name,city   only these fields (id is always included); only their
+#                      columns are selected, and genres are only loaded
+#                      when asked for
+#   limit=50           page size, up to MAX_LIMIT
+#   cursor=...         the 'next' value of the previous page (keyset on id,
+#                      or on (start_time, id) for shows)
+#   include=shows      venues and artists: embed their next INCLUDED_SHOWS
+#                      upcoming shows, loaded for the whole page in one query
+# Soft-deleted venues, and the shows booked at them, are left out.
+# ----------------------------------------------------------------------------#
+
+API_VERSION = 'v1'
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+INCLUDED_SHOWS = 20
+SHOW_FIELDS = ('id', 'venue_id', 'artist_id', 'start_time')
+
+# model, public fields, genre association column, Show_Table foreign key
+Resource = namedtuple('Resource', 'model fields genre_key show_key')
+
+RESOURCES = {
+    'venues': Resource(Venue,
+                       ('id', 'name', 'city', 'state', 'address', 'phone', 'genres',
+                        'image_link', 'facebook_link', 'website', 'seeking_talent',
+                        'seeking_description', 'upcoming_shows_count', 'past_shows_count',
+                        'updated_at'),
+                       venue_genres.c.venue_id, Show_Table.venue_id),
+    'artists': Resource(Artist,
+                        ('id', 'name', 'city', 'state', 'phone', 'genres',
+                         'image_link', 'facebook_link', 'website', 'seeking_venue',
+                         'seeking_description', 'upcoming_shows_count', 'past_shows_count',
+                         'updated_at'),
+                        artist_genres.c.artist_id, Show_Table.artist_id),
+    'shows': Resource(Show_Table, SHOW_FIELDS + ('updated_at',), None, None),
+}
+
+api_v1 = Blueprint('api_v1', __name__, url_prefix='/api/' + API_VERSION)
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, default=_default, separators=(',', ':'))
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError('{!r} is not JSON serializable'.format(value))
+
+
+def json_response(data, status=200):
+    return Response(dumps(data), status=status, mimetype='application/json')
+
+
+class BadRequest(Exception):
+
+    def __init__(self, field, message):
+        super().__init__(message)
+        self.errors = {field: [message]}
+
+
+@api_v1.errorhandler(BadRequest)
+def bad_request(error):
+    return json_response({'errors': error.errors}, 400)
+
+
+def parse_fields(resource):
+    """ The requested fields, in the resource's order, always with id. """
+    requested = request.args.get('fields')
+    if not requested:
+        return list(resource.fields)
+    names = set(name.strip() for name in requested.split(',') if name.strip())
+    unknown = sorted(names.difference(resource.fields))
+    if unknown:
+        raise BadRequest('fields', 'Unknown field(s): {}.'.format(', '.join(unknown)))
+    return [name for name in resource.fields if name == 'id' or name in names]
+
+
+def parse_include(resource):
+    include = set(name for name in request.args.get('include', '').split(',') if name)
+    if not include:
+        return False
+    if include != {'shows'} or resource.show_key is None:
+        raise BadRequest('include', 'Only venues and artists can include shows.')
+    return True
+
+
+def parse_limit():
+    try:
+        limit = int(request.args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        limit = None
+    if limit is None or not 1 <= limit <= MAX_LIMIT:
+        raise BadRequest('limit', 'Must be between 1 and {}.'.format(MAX_LIMIT))
+    return limit
+
+
+def hidden_venues():
+    return db.session.query(Venue.id).filter(Venue.deleted_at.isnot(None))
+
+
+def select(resource, fields):
+    """ Query of only the columns behind fields, visible rows only. """
+    model = resource.model
+    query = db.session.query(*(getattr(model, name) for name in fields if name != 'genres')) \
+        .filter(visible(model))
+    if model is Show_Table:
+        query = query.filter(Show_Table.start_time.isnot(None),
+                             Show_Table.venue_id.notin_(hidden_venues()))
+    return query
+
+
+def serialize(resource, fields, rows, include_shows):
+    records = [{name: value for name, value in zip(row.keys(), row)} for row in rows]
+    ids = [record['id'] for record in records]
+    if ids and 'genres' in fields:
+        genres = {}
+        for record_id, name in db.session.query(resource.genre_key, Genre.name) \
+                .join(Genre, Genre.id == resource.genre_key.table.c.genre_id) \
+                .filter(resource.genre_key.in_(ids)) \
+                .order_by(resource.genre_key, Genre.name):
+            genres.setdefault(record_id, []).append(name)
+        for record in records:
+            record['genres'] = genres.get(record['id'], [])
+    if include_shows:
+        shows = upcoming_shows(resource.show_key, ids)
+        for record in records:
+            record['shows'] = shows.get(record['id'], [])
+    # the resource's field order, whatever order the columns came in
+    return [{name: record[name] for name in fields + (['shows'] if include_shows else [])}
+            for record in records]
+
+
+def upcoming_shows(key, ids, now=None):
+    """ {parent id: [show]} with the next INCLUDED_SHOWS upcoming shows of
+    each parent, from one windowed query for all of them.
+    """
+    if not ids:
+        return {}
+    if now is None:
+        now = datetime.today()
+    position = db.func.row_number().over(partition_by=key,
+                                         order_by=(Show_Table.start_time, Show_Table.id))
+    ranked = db.session.query(*(getattr(Show_Table, name) for name in SHOW_FIELDS),
+                              position.label('position')) \
+        .filter(key.in_(ids),
+                Show_Table.start_time >= now,
+                Show_Table.venue_id.notin_(hidden_venues())) \
+        .subquery()
+    shows = {}
+    for row in db.session.query(ranked) \
+            .filter(ranked.c.position <= INCLUDED_SHOWS) \
+            .order_by(ranked.c[key.key], ranked.c.position):
+        shows.setdefault(row[key.key], []).append({name: row[name] for name in SHOW_FIELDS})
+    return shows
+
+
+@api_v1.route('/<kind>')
+def collection(kind):
+    resource = RESOURCES.get(kind)
+    if resource is None:
+        return json_response({'errors': {'path': ['No such collection.']}}, 404)
+    fields = parse_fields(resource)
+    include_shows = parse_include(resource)
+    limit = parse_limit()
+    cursor = request.args.get('cursor')
+
+    model = resource.model
+    query = select(resource, fields)
+    if model is Show_Table:
+        # keyset on (start_time, id), as /shows
+        start_key = 'start_time' if 'start_time' in fields else '_start_time'
+        if start_key not in fields:
+            query = query.add_columns(Show_Table.start_time.label(start_key))
+        if cursor:
+            after = decode_cursor(cursor)
+            if after is None:
+                raise BadRequest('cursor', 'Not a valid cursor.')
+            query = query.filter(db.tuple_(Show_Table.start_time, Show_Table.id) > after)
+        query = query.order_by(Show_Table.start_time, Show_Table.id)
+    else:
+        if cursor:
+            if not cursor.isdigit():
+                raise BadRequest('cursor', 'Not a valid cursor.')
+            query = query.filter(model.id > int(cursor))
+        query = query.order_by(model.id)
+
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if model is Show_Table:
+            next_cursor = encode_cursor(getattr(last, start_key), last.id)
+        else:
+            next_cursor = str(last.id)
+    return json_response({'data': serialize(resource, fields, rows, include_shows),
+                          'next': next_cursor})
+
+
+@api_v1.route('/<kind>/<int:record_id>')
+def record(kind, record_id):
+    resource = RESOURCES.get(kind)
+    if resource is None:
+        return json_response({'errors': {'path': ['No such collection.']}}, 404)
+    fields = parse_fields(resource)
+    include_shows = parse_include(resource)
+    row = select(resource, fields).filter(resource.model.id == record_id).one_or_none()
+    if row is None:
+        return json_response({'errors': {'id': ['No such record.']}}, 404)
+    return json_response({'data': serialize(resource, fields, [row], include_shows)[0]})
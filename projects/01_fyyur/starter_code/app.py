@@ -3,9 +3,11 @@
 # ----------------------------------------------------------------------------#
 
 import json
+import functools
 import dateutil.parser
 import babel
 import sys
+from datetime import datetime
 from flask import (
     Flask,
     render_template,
@@ -14,15 +16,39 @@ from flask import (
     flash,
     redirect,
     url_for,
-    jsonify )
+    jsonify,
+    g,
+    has_app_context,
+    stream_with_context )
 from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 import logging
-from logging import Formatter, FileHandler
 from flask_wtf import FlaskForm as Form
 from forms import *
 from flask_migrate import Migrate
 from Models import *
+from directory import venue_directory
+from counters import counters_cli
+from search import search_by_name
+from details import detail_page, detail_validators
+from show_listing import ShowPage
+from cache import PageCache, add_cache_tags, conditional
+from importer import fyyur_cli
+from profiler import QueryProfiler
+from logs import init_logging
+from routing import use_primary
+from typeahead import Typeahead
+from calendar_feed import Calendar, parse_range
+from editing import apply_form_changes, is_stale, STALE_MESSAGE
+from deletion import deletion_progress, soft_delete_venue, venues_cli
+from assets import Assets, assets_cli
+from recurrence import create_series
+from templating import Templates
+from api import api_v1
+from geo import parse_center, venues_near
+from recommendations import recommendations_cli
 
 # import sys
 # sys.path.append("/home/alvaro/PycharmProjects/FullStack_Project1/FSND/projects/01_fyyur/starter_code")
@@ -41,23 +67,65 @@ db.init_app(app)
 
 migrate = Migrate(app, db, compare_type=True)
 
+app.cli.add_command(counters_cli)
+app.cli.add_command(fyyur_cli)
+app.cli.add_command(venues_cli)
+app.cli.add_command(assets_cli)
+app.cli.add_command(recommendations_cli)
+app.register_blueprint(api_v1)
+
+page_cache = PageCache(app)
+query_profiler = QueryProfiler(app)
+typeahead = Typeahead(app)
+assets = Assets(app)
+templates = Templates(app)
+
 
 # ----------------------------------------------------------------------------#
 # Filters.
 # ----------------------------------------------------------------------------#
 
+DATETIME_FORMATS = {'full': "EEEE MMMM, d, y 'at' h:mma",
+                    'medium': "EE MM, dd, y h:mma"}
+
+
+@functools.lru_cache(maxsize=None)
+def datetime_formatter(format, locale=babel.dates.LC_TIME):
+    """ Compiled babel pattern for (format, locale), as a one-argument callable. """
+    pattern = babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format))
+    return functools.partial(pattern.apply, locale=babel.Locale.parse(locale))
+
+
 def format_datetime(value, format='medium'):
-    date = dateutil.parser.parse(value)
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format)
+    # views pass datetimes; strings are still accepted
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            value = dateutil.parser.parse(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=babel.dates.UTC)
+
+    # the same show time often appears several times on one page
+    memo = g.setdefault('datetime_memo', {}) if has_app_context() else {}
+    key = (value, format)
+    if key not in memo:
+        memo[key] = datetime_formatter(format)(value)
+    return memo[key]
 
 
 app.jinja_env.filters['datetime'] = format_datetime
 
 
+def stream_template(template_name, **context):
+    # Flask 1.1 has no stream_template(); this is the recipe from its docs
+    app.update_template_context(context)
+    template = app.jinja_env.get_template(template_name)
+    stream = template.stream(context)
+    stream.enable_buffering(5)
+    return stream
+
+
 # ----------------------------------------------------------------------------#
 # Controllers.
 # ----------------------------------------------------------------------------#
@@ -71,115 +139,48 @@ def index():
 #  ----------------------------------------------------------------
 
 @app.route('/venues')
+@page_cache.cached('venues')
 def venues():
-    cities = [r.city for r in db.session.query(Venue.city).distinct()]
-
-    data = []
-    aggregated_sum = 0
-    for city_name in cities:
-
-        query = db.session.query(Venue, db.func.count('num_upcoming_shows')) \
-            .outerjoin(Show_Table) \
-            .filter(Venue.city == city_name) \
-            .group_by(Venue.id) \
-            .having(db.func.count('num_upcoming_shows') > 0)
-        venues = [venue for (venue, numShows) in query.all()]
-
-        upcomingShows_LUT = dict(query
-                                 .filter(Show_Table.start_time >= datetime.today())
-                                 .all())
-
-        venue_lst = []
-        for venue in venues:
-            aggregated_sum = aggregated_sum + upcomingShows_LUT.get(venue, 0)
-            venue_info = {"id": venue.id,
-                          "name": venue.name,
-                          "num_upcoming_shows": aggregated_sum}
-            venue_lst.append(venue_info)
-
-        city_info = {
-            'city': city_name,
-            'state': venue.state,
-            'venues': venue_lst}
-
-        data.append(city_info)
-    return render_template('pages/venues.html', areas=data)
+    genre = request.args.get('genre')
+    return render_template('pages/venues.html', areas=venue_directory(genre=genre))
 
 
 @app.route('/venues/search', methods=['POST'])
 def search_venues():
     search_term = request.form.get('search_term', '')
-    search_term = "%{}%".format(search_term)
-
-    query = db.session.query(Venue, db.func.count('num_upcoming_shows')) \
-        .outerjoin(Show_Table) \
-        .filter(Venue.name.ilike(search_term)) \
-        .group_by(Venue.id) \
-        .having(db.func.count('num_upcoming_shows') > 0)
+    page = request.form.get('page', 1, type=int)
 
-    response = {'count': query.count()}
+    response = search_by_name(Venue, search_term, page=page)
 
-    venues = [venue for (venue, numShows) in query.all()]
+    return render_template('pages/search_venues.html', results=response,
+                           search_term=search_term)
 
-    upcomingShows_LUT = dict(query
-                             .filter(Show_Table.start_time >= datetime.today())
-                             .all())
-    data = []
-    for venue in venues:
-        venue_info = {"id": venue.id,
-                      "name": venue.name,
-                      "num_upcoming_shows": upcomingShows_LUT.get(venue, 0)}
-        data.append(venue_info)
 
-    response['data'] = data
-    return render_template('pages/search_venues.html', results=response,
-                           search_term=request.form.get('search_term', ''))
+@app.route('/venues/near')
+def near_venues():
+    # ?lat=&lon= or ?city=&state=, and radius_km= (default 25)
+    latitude, longitude, radius_km, errors = parse_center(request.args)
+    if errors:
+        return jsonify({'errors': errors}), 400
+    return jsonify({'lat': latitude,
+                    'lon': longitude,
+                    'radius_km': radius_km,
+                    'venues': venues_near(latitude, longitude, radius_km)})
 
 
 @app.route('/venues/<int:venue_id>')
+@conditional(lambda venue_id: detail_validators(Venue, venue_id))
+@page_cache.cached()
 def show_venue(venue_id):
-    query_venue = db.session.query(Venue)\
-                   .filter(Venue.id == venue_id)
+    data = detail_page(Venue, venue_id)
 
-    if not query_venue.all():
-        return render_template('errors/404.html')
+    if data is None:
+        return render_template('errors/404.html'), 404
     else:
-
-        data = query_venue.all()[0].__dict__
-
-        query = db.session.query(Show_Table) \
-            .outerjoin(Venue) \
-            .filter(Show_Table.venue_id == venue_id)
-
-        upcoming_shows_query = query \
-            .filter(Show_Table.start_time >= datetime.today())
-
-        result = []
-        for show in upcoming_shows_query.all():
-            element = {
-                "artist_id": show.artists.id,
-                "artist_name": show.artists.name,
-                "artist_image_link": show.artists.image_link,
-                "start_time": str(show.start_time)}
-            result.append(element)
-
-        data["upcoming_shows"] = result
-        data["upcoming_shows_count"] = upcoming_shows_query.count()
-
-        past_shows_query = query \
-            .filter(Show_Table.start_time < datetime.today())
-
-        result = []
-        for show in past_shows_query.all():
-            element = {
-                "artist_id": show.artists.id,
-                "artist_name": show.artists.name,
-                "artist_image_link": show.artists.image_link,
-                "start_time": str(show.start_time)}
-            result.append(element)
-
-        data["past_shows"] = result
-        data["past_shows_count"] = past_shows_query.count()
+        add_cache_tags('venue:{}'.format(venue_id),
+                       *('artist:{}'.format(show['artist_id'])
+                         for show in data['upcoming_shows'] + data['past_shows']))
+        add_cache_tags(*('artist:{}'.format(suggestion['id']) for suggestion in data['suggestions']))
         return render_template('pages/show_venue.html', venue=data)
 
 
@@ -194,7 +195,6 @@ def create_venue_form():
 
 @app.route('/venues/create', methods=['POST'])
 def create_venue_submission():
-    print('create_venue_submission()')
     # print( Venue.query.first() )
     # Venue.query.filter_by(id=1).delete()
 
@@ -217,10 +217,11 @@ def create_venue_submission():
 
             db.session.add(venue)
             db.session.commit()
+            page_cache.invalidate('venues')
             flash('Venue ' + request.form['name'] + ' was successfully listed!')
         except:
             db.session.rollback()
-            print(sys.exc_info())
+            app.logger.exception('Could not create venue')
             flash('An error occurred. Venue ' + request.form['name'] + ' could not be listed.')
         finally:
             db.session.close()
@@ -235,28 +236,53 @@ def create_venue_submission():
 
 @app.route('/venues/<venue_id>', methods=['DELETE'])
 def delete_venue(venue_id):
+    # the venue is hidden right away; its shows are purged in the background
+    # by `flask venues purge` (see deletion.py)
     try:
-        Venue.query.filter_by(id=venue_id).delete()
+        deletion = soft_delete_venue(venue_id)
+        if deletion is None:
+            return jsonify({'success': False}), 404
         db.session.commit()
+        page_cache.invalidate('venues', 'venue:{}'.format(venue_id))
 
         flash('Venue was successfully deleted!')
 
     except:
         db.session.rollback()
-        print(sys.exc_info())
+        app.logger.exception('Could not delete venue %s', venue_id)
 
         venue = Venue.query.get(venue_id)
         flash('An error occurred. Venue ' + venue.name + ' could not be deleted.')
+        return jsonify({'success': False}), 500
+
+    return jsonify({'success': True,
+                    'progress': url_for('venue_deletion', venue_id=venue_id)})
 
-    return jsonify({'success': True})
+
+@app.route('/venues/<int:venue_id>/deletion')
+def venue_deletion(venue_id):
+    deletion = Venue_Deletion.query.get(venue_id)
+    if deletion is None:
+        return not_found_error(None)
+    return jsonify(deletion_progress(deletion))
 
 
 #  Artists
 #  ----------------------------------------------------------------
 @app.route('/artists')
+@page_cache.cached('artists')
 def artists():
+    query = db.session.query(Artist.id, Artist.name)
+
+    genre = request.args.get('genre')
+    if genre:
+        query = query \
+            .join(artist_genres) \
+            .join(Genre) \
+            .filter(Genre.name == genre)
+
     data = []
-    for (record_id, name) in db.session.query(Artist.id, Artist.name):
+    for (record_id, name) in query.order_by(Artist.name, Artist.id):
         element = {'id': record_id,
                    'name': name}
 
@@ -267,86 +293,35 @@ def artists():
 
 @app.route('/artists/search', methods=['POST'])
 def search_artists():
-
     search_term = request.form.get('search_term', '')
-    search_term = "%{}%".format(search_term)
-
-    query = db.session.query(Artist, db.func.count('num_upcoming_shows')) \
-        .outerjoin(Show_Table) \
-        .filter(Artist.name.ilike(search_term)) \
-        .group_by(Artist.id) \
-        .having(db.func.count('num_upcoming_shows') > 0)
-
-    response = {'count': query.count()}
-
-    artists = [artist for (artist, numShows) in query.all()]
+    page = request.form.get('page', 1, type=int)
 
-    upcomingShows_LUT = dict(query
-                             .filter(Show_Table.start_time >= datetime.today())
-                             .all())
-    data = []
-    for artist in artists:
-        artist_info = {"id": artist.id,
-                       "name": artist.name,
-                       "num_upcoming_shows": upcomingShows_LUT.get(artist, 0)}
-        data.append(artist_info)
-
-    response['data'] = data
+    response = search_by_name(Artist, search_term, page=page)
 
     return render_template('pages/search_artists.html', results=response,
-                           search_term=request.form.get('search_term', ''))
+                           search_term=search_term)
 
 
 @app.route('/artists/<int:artist_id>')
+@conditional(lambda artist_id: detail_validators(Artist, artist_id))
+@page_cache.cached()
 def show_artist(artist_id):
-    query_artist = db.session.query(Artist) \
-        .filter(Artist.id == artist_id)
+    data = detail_page(Artist, artist_id)
 
-    if not query_artist.all():
-        return render_template('errors/404.html')
+    if data is None:
+        return render_template('errors/404.html'), 404
     else:
-        data = query_artist.all()[0].__dict__
-
-        query = db.session.query(Show_Table) \
-            .outerjoin(Artist) \
-            .filter(Show_Table.artist_id == artist_id)
-
-        upcoming_shows_query = query \
-            .filter(Show_Table.start_time >= datetime.today())
-
-        result = []
-        for show in upcoming_shows_query.all():
-            element = {
-                "venue_id": show.venues.id,
-                "venue_name": show.venues.name,
-                "venue_image_link": show.venues.image_link,
-                "start_time": str(show.start_time)}
-            result.append(element)
-
-        data["upcoming_shows"] = result
-        data["upcoming_shows_count"] = upcoming_shows_query.count()
-
-        past_shows_query = query \
-            .filter(Show_Table.start_time < datetime.today())
-
-        result = []
-        for show in past_shows_query.all():
-            element = {
-                "venue_id": show.venues.id,
-                "venue_name": show.venues.name,
-                "venue_image_link": show.venues.image_link,
-                "start_time": str(show.start_time)}
-            result.append(element)
-
-        data["past_shows"] = result
-        data["past_shows_count"] = past_shows_query.count()
-
+        add_cache_tags('artist:{}'.format(artist_id),
+                       *('venue:{}'.format(show['venue_id'])
+                         for show in data['upcoming_shows'] + data['past_shows']))
+        add_cache_tags(*('venue:{}'.format(suggestion['id']) for suggestion in data['suggestions']))
         return render_template('pages/show_artist.html', artist=data)
 
 
 #  Update
 #  ----------------------------------------------------------------
 @app.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@use_primary  # the form is posted back as a whole
 def edit_artist(artist_id):
     artist = Artist.query.get(artist_id)
     db.session.close()
@@ -362,21 +337,24 @@ def edit_artist(artist_id):
 def edit_artist_submission(artist_id):
     try:
         artist = Artist.query.get(artist_id)
-        column_names = Artist.__table__.columns.keys()[1:]  # skip 'id' column field
-        for key in column_names:
-            if key == 'seeking_venue':
-                artist.__setattr__(key, request.form.get(key) == 'True')
-            elif key == 'genres':
-                artist.__setattr__(key, request.form.getlist(key))
-            else:
-                artist.__setattr__(key, request.form.get(key))
+        if is_stale(artist, request.form):
+            flash(STALE_MESSAGE.format('Artist', request.form['name']))
+            return redirect(url_for('edit_artist', artist_id=artist_id))
 
-        db.session.commit()
+        # only the fields that changed are written
+        if apply_form_changes(artist, request.form):
+            db.session.commit()
+            page_cache.invalidate('artists', 'artist:{}'.format(artist_id))
 
         flash('Artist ' + request.form['name'] + ' was successfully updated!')
+    except StaleDataError:
+        # another edit was committed between our read and our write
+        db.session.rollback()
+        flash(STALE_MESSAGE.format('Artist', request.form['name']))
+        return redirect(url_for('edit_artist', artist_id=artist_id))
     except:
         db.session.rollback()
-        print(sys.exc_info())
+        app.logger.exception('Could not update artist %s', artist_id)
         flash('An error occurred. Artist ' + request.form['name'] + ' could not be updated.')
 
     finally:
@@ -386,11 +364,12 @@ def edit_artist_submission(artist_id):
 
 
 @app.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@use_primary  # the form is posted back as a whole
 def edit_venue(venue_id):
     venue = Venue.query.get(venue_id)
     db.session.close()
 
-    if venue is None:
+    if venue is None or venue.deleted_at is not None:
         return redirect(url_for('venues'))
     else:
         form = VenueForm(obj=venue)
@@ -401,21 +380,24 @@ def edit_venue(venue_id):
 def edit_venue_submission(venue_id):
     try:
         venue = Venue.query.get(venue_id)
-        column_names = Venue.__table__.columns.keys()[1:]  # skip 'id' column field
-        for key in column_names:
-            if key == 'seeking_talent':
-                venue.__setattr__(key, request.form.get(key) == 'True')
-            elif key == 'genres':
-                venue.__setattr__(key, request.form.getlist(key))
-            else:
-                venue.__setattr__(key, request.form.get(key))
+        if is_stale(venue, request.form):
+            flash(STALE_MESSAGE.format('Venue', request.form['name']))
+            return redirect(url_for('edit_venue', venue_id=venue_id))
 
-        db.session.commit()
+        # only the fields that changed are written
+        if apply_form_changes(venue, request.form):
+            db.session.commit()
+            page_cache.invalidate('venues', 'venue:{}'.format(venue_id))
 
         flash('Venue ' + request.form['name'] + ' was successfully updated!')
+    except StaleDataError:
+        # another edit was committed between our read and our write
+        db.session.rollback()
+        flash(STALE_MESSAGE.format('Venue', request.form['name']))
+        return redirect(url_for('edit_venue', venue_id=venue_id))
     except:
         db.session.rollback()
-        print(sys.exc_info())
+        app.logger.exception('Could not update venue %s', venue_id)
         flash('An error occurred. Venue ' + request.form['name'] + ' could not be updated.')
 
     finally:
@@ -454,10 +436,11 @@ def create_artist_submission():
 
             db.session.add(artist)
             db.session.commit()
+            page_cache.invalidate('artists')
             flash('Artist ' + request.form['name'] + ' was successfully listed!')
         except:
             db.session.rollback()
-            print(sys.exc_info())
+            app.logger.exception('Could not create artist')
             flash('An error occurred. Artist ' + request.form['name'] + ' could not be listed.')
         finally:
             db.session.close()
@@ -475,19 +458,8 @@ def create_artist_submission():
 
 @app.route('/shows')
 def shows():
-    data = []
-    shows_list = Show_Table.query.all()
-    for show in shows_list:
-        element = {"venue_id": show.venues.id,
-                   "venue_name": show.venues.name,
-                   "artist_id": show.artists.id,
-                   "artist_name": show.artists.name,
-                   "artist_image_link": show.artists.image_link,
-                   "start_time": str(show.start_time)}
-
-        data.append(element)
-
-    return render_template('pages/shows.html', shows=data)
+    page = ShowPage(after=request.args.get('after'))
+    return Response(stream_with_context(stream_template('pages/shows.html', shows=page)))
 
 
 @app.route('/shows/create')
@@ -510,10 +482,17 @@ def create_show_submission():
                 start_time=dateutil.parser.parse(request.form['start_time']))
             db.session.add(show)
             db.session.commit()
+            page_cache.invalidate('venues', 'artists',
+                                  'venue:{}'.format(show.venue_id),
+                                  'artist:{}'.format(show.artist_id))
             flash('Show was successfully listed!')
+        except IntegrityError:
+            # a concurrent booking got past the form check (Postgres only)
+            db.session.rollback()
+            flash('Show could not be listed: the venue or artist was just booked at that time.')
         except:
             db.session.rollback()
-            print(sys.exc_info())
+            app.logger.exception('Could not create show')
             flash('An error occurred. Show could not be listed.')
         finally:
             db.session.close()
@@ -526,6 +505,106 @@ def create_show_submission():
     return render_template('pages/home.html')
 
 
+@app.route('/shows/create/recurring')
+def create_recurring_shows():
+    form = RecurringShowForm()
+    return render_template('forms/new_recurring_show.html', form=form)
+
+
+@app.route('/shows/create/recurring', methods=['POST'])
+def create_recurring_show_submission():
+    # the whole series is checked and inserted in one transaction
+    form = RecurringShowForm(request.form, meta={'csrf': False})
+
+    if form.validate():
+        try:
+            shows = create_series(form.venue_id.data, form.artist_id.data, form.occurrences)
+            db.session.commit()
+            page_cache.invalidate('venues', 'artists',
+                                  'venue:{}'.format(form.venue_id.data),
+                                  'artist:{}'.format(form.artist_id.data))
+            flash('{} shows were successfully listed!'.format(len(shows)))
+        except IntegrityError:
+            # a concurrent booking got past the form check (Postgres only)
+            db.session.rollback()
+            flash('Shows could not be listed: the venue or artist was just booked at one of those times.')
+        except:
+            db.session.rollback()
+            app.logger.exception('Could not create recurring shows')
+            flash('An error occurred. Shows could not be listed.')
+        finally:
+            db.session.close()
+    else:
+        message = []
+        for field, err in form.errors.items():
+            message.append(field + ' ' + '|'.join(err))
+        flash('Errors ' + str(message))
+
+    return render_template('pages/home.html')
+
+
+def calendar_response(model, entity_id, summary):
+    start, end, errors = parse_range(request.args.get('from'), request.args.get('to'))
+    if errors:
+        return jsonify({'errors': errors}), 400
+    variant = 'ics' if request.args.get('format') == 'ics' else 'json'
+
+    calendar = Calendar(model, entity_id, start, end)
+    etag = calendar.etag(variant)
+    if etag is None:
+        return not_found_error(None)
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    elif variant == 'ics':
+        response = Response(stream_with_context(calendar.ical_chunks(summary)),
+                            mimetype='text/calendar')
+    else:
+        response = Response(stream_with_context(calendar.json_chunks()),
+                            mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+
+@app.route('/venues/<int:venue_id>/calendar')
+def venue_calendar(venue_id):
+    # ?from=&to= ISO dates (default: the next 7 days), format=json|ics
+    return calendar_response(Venue, venue_id, '{artist_name}')
+
+
+@app.route('/artists/<int:artist_id>/calendar')
+def artist_calendar(artist_id):
+    return calendar_response(Artist, artist_id, '{venue_name}')
+
+
+@app.route('/typeahead')
+def typeahead_search():
+    # ?q=<prefix>, optionally narrowed with kind=venues / kind=artists
+    kinds = [kind for kind in request.args.getlist('kind') if kind in Typeahead.MODELS]
+    return jsonify(typeahead.search(request.args.get('q', ''), kinds or None))
+
+
+@app.route('/_debug/cache')
+def debug_cache():
+    if not app.config.get('DEBUG_ENDPOINTS'):
+        return not_found_error(None)
+    return jsonify(page_cache.stats())
+
+
+@app.route('/_debug/metrics')
+def debug_metrics():
+    if not app.config.get('DEBUG_ENDPOINTS'):
+        return not_found_error(None)
+    return jsonify(query_profiler.stats())
+
+
+@app.route('/_debug/typeahead')
+def debug_typeahead():
+    if not app.config.get('DEBUG_ENDPOINTS'):
+        return not_found_error(None)
+    return jsonify(typeahead.stats())
+
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -537,14 +616,13 @@ def server_error(error):
 
 
 if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info('errors')
+    init_logging(app)
+
+# compile the templates and babel patterns now rather than on first use
+if app.config['TEMPLATE_WARMUP']:
+    for _format in DATETIME_FORMATS:
+        datetime_formatter(_format)
+    templates.warm(app)
 
 # ----------------------------------------------------------------------------#
 # Launch.
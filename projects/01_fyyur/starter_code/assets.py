@@ -0,0 +1,187 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import click
+from flask import abort, current_app, request, send_from_directory, url_for
+from flask.cli import AppGroup
+
+# ----------------------------------------------------------------------------#
+# Static assets.
+#
+# `flask assets build` copies every file under static/ to static/build/ with
+# a content hash in its name (css/main.css -> css/main.1f0c9a2b7d3e.css),
+# writes gzip and (with the optional brotli package) brotli variants of the
+# compressible ones, and records the names in manifest.json. url() references
+# in CSS are rewritten to the hashed names before the CSS itself is hashed.
+#
+# Templates link assets with asset_url(); the hashed files are served from
+# /assets/ as immutable for a year, brotli or gzip encoded when the client
+# accepts it. Without a manifest (or with ASSETS_HASHED_URLS off, as in
+# development) asset_url() returns the plain /static/ URL.
+# ----------------------------------------------------------------------------#
+
+BUILD_DIR = 'build'
+MANIFEST = 'manifest.json'
+HASH_LENGTH = 12
+COMPRESSIBLE = frozenset(['.css', '.js', '.map', '.svg', '.ttf', '.otf', '.eot',
+                          '.json', '.txt', '.html', '.ico'])
+# the suffixes of the precompressed variants, preferred first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def hashed_name(path, content):
+    root, ext = posixpath.splitext(path)
+    return '{}.{}{}'.format(root, hashlib.sha256(content).hexdigest()[:HASH_LENGTH], ext)
+
+
+def rewrite_css_urls(path, css, manifest):
+    """ css with relative url()s that point at built assets replaced by their
+    hashed names. path is the stylesheet's own path under static/.
+    """
+    directory = posixpath.dirname(path)
+
+    def replace(match):
+        quote, target = match.groups()
+        if target.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        split = min([n for n in (target.find('?'), target.find('#')) if n >= 0],
+                    default=len(target))
+        asset = posixpath.normpath(posixpath.join(directory, target[:split]))
+        if asset not in manifest:
+            return match.group(0)
+        hashed = posixpath.relpath(manifest[asset]['path'], directory or '.')
+        return 'url({0}{1}{2}{0})'.format(quote, hashed, target[split:])
+
+    return CSS_URL.sub(replace, css.decode()).encode()
+
+
+def compress(content):
+    """ {encoding: bytes} of the variants that are smaller than content. """
+    variants = {'gzip': gzip.compress(content, 9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        variants['br'] = brotli.compress(content, quality=11)
+    return {encoding: data for encoding, data in variants.items() if len(data) < len(content)}
+
+
+def build_assets(static_folder):
+    """ Build static_folder/build and its manifest. Returns the manifest:
+    {path: {'path': hashed path, 'encodings': [encoding]}}.
+    """
+    build_folder = os.path.join(static_folder, BUILD_DIR)
+    sources = []
+    for directory, subdirectories, files in os.walk(static_folder):
+        if os.path.abspath(directory) == os.path.abspath(static_folder):
+            subdirectories[:] = [d for d in subdirectories if d != BUILD_DIR]
+        subdirectories[:] = [d for d in subdirectories if not d.startswith('.')]
+        for name in files:
+            if not name.startswith('.'):
+                full = os.path.join(directory, name)
+                sources.append(os.path.relpath(full, static_folder).replace(os.sep, '/'))
+
+    manifest = {}
+    # stylesheets last, so the assets they reference are already hashed
+    for path in sorted(sources, key=lambda p: (p.endswith('.css'), p)):
+        with open(os.path.join(static_folder, path), 'rb') as source:
+            content = source.read()
+        if path.endswith('.css'):
+            content = rewrite_css_urls(path, content, manifest)
+
+        hashed = hashed_name(path, content)
+        variants = {None: content}
+        if posixpath.splitext(path)[1].lower() in COMPRESSIBLE:
+            variants.update(compress(content))
+        for encoding, suffix in ((None, ''),) + ENCODINGS:
+            if encoding in variants:
+                target = os.path.join(build_folder, *(hashed + suffix).split('/'))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, 'wb') as output:
+                    output.write(variants[encoding])
+        manifest[path] = {'path': hashed,
+                          'encodings': [encoding for encoding, _ in ENCODINGS if encoding in variants]}
+
+    with open(os.path.join(build_folder, MANIFEST), 'w') as output:
+        json.dump(manifest, output, indent=1, sort_keys=True)
+    return manifest
+
+
+class Assets:
+
+    def __init__(self, app=None):
+        self.urls = {}  # path -> hashed path
+        self.encodings = {}  # hashed path -> [encoding]
+        self.folder = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['assets'] = self
+        app.config.setdefault('ASSETS_HASHED_URLS', True)
+        self.folder = os.path.join(app.static_folder, BUILD_DIR)
+        if app.config['ASSETS_HASHED_URLS']:
+            self.load(os.path.join(self.folder, MANIFEST))
+        app.add_url_rule('/assets/<path:filename>', 'asset', self.send)
+        app.add_template_global(self.url, 'asset_url')
+
+    def load(self, manifest_path):
+        try:
+            with open(manifest_path) as manifest:
+                entries = json.load(manifest)
+        except FileNotFoundError:
+            return
+        self.urls = {path: entry['path'] for path, entry in entries.items()}
+        self.encodings = {entry['path']: entry['encodings'] for entry in entries.values()}
+
+    def url(self, path):
+        """ URL of the static file at path (relative to static/). """
+        hashed = self.urls.get(path)
+        if hashed is None:
+            return url_for('static', filename=path)
+        return url_for('asset', filename=hashed)
+
+    def send(self, filename):
+        if filename not in self.encodings:
+            abort(404)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        encoding, suffix = None, ''
+        for candidate, candidate_suffix in ENCODINGS:
+            if candidate in self.encodings[filename] and request.accept_encodings[candidate]:
+                encoding, suffix = candidate, candidate_suffix
+                break
+
+        response = send_from_directory(self.folder, filename + suffix, mimetype=mimetype)
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Cache-Control'] = IMMUTABLE
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+# ----------------------------------------------------------------------------#
+# Commands.
+# ----------------------------------------------------------------------------#
+
+assets_cli = AppGroup('assets', help='Static asset pipeline.')
+
+
+@assets_cli.command('build')
+def build_command():
+    """Hash, compress and index the files under static/. Run on deploy."""
+    manifest = build_assets(current_app.static_folder)
+    num_compressed = sum(1 for entry in manifest.values() if entry['encodings'])
+    click.echo('Built {} asset(s), {} precompressed, into {}.'.format(
+        len(manifest), num_compressed, os.path.join(current_app.static_folder, BUILD_DIR)))
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        click.echo('brotli is not installed; only gzip variants were written.')
@@ -0,0 +1,84 @@
+""" Cold start of a worker: time from process start to the first byte of the
+first response, with and without the template bytecode cache and warm-up.
+
+Each run is a fresh interpreter, as a new worker would be. 'startup' is the
+import of app.py (including any warm-up), 'first request' the first
+response after it; both pages are rendered without the database. Most of
+the startup time is importing the app's dependencies, which no template
+setting changes; compare the warm-up and first request columns.
+
+Usage: python benchmarks/bench_cold_start.py [runs]
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import common  # noqa: F401 (sys.path)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ['/', '/shows/create']
+
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+import config
+config.TEMPLATE_CACHE_DIR = {cache_dir!r}
+config.TEMPLATE_WARMUP = {warmup!r}
+config.TYPEAHEAD_WARMUP = False
+config.SQLALCHEMY_DATABASE_URI = 'sqlite://'
+import app
+started = time.perf_counter()
+client = app.app.test_client()
+timings = []
+for path in {pages!r}:
+    request_start = time.perf_counter()
+    response = client.get(path)
+    next(iter(response.response))
+    timings.append(time.perf_counter() - request_start)
+print(json.dumps({{'startup': started - start, 'first': timings[0],
+                  'ttfb': started - start + timings[0], 'pages': timings,
+                  'warmup': app.templates.warm_seconds or 0}}))
+'''
+
+SCENARIOS = [
+    ('no cache, no warm-up', False, False, False),
+    ('cold disk cache, no warm-up', True, False, False),
+    ('warm disk cache, no warm-up', True, True, False),
+    ('no cache, warm-up', False, False, True),
+    ('warm disk cache, warm-up', True, True, True),
+]
+
+
+def run(cache_dir, warmup):
+    code = CHILD.format(cache_dir=cache_dir, warmup=warmup, pages=PAGES)
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(runs):
+    print('{:<30} {:>11} {:>10} {:>13} {:>9}'.format(
+        '', 'startup ms', 'warm-up ms', 'first req ms', 'ttfb ms'))
+    for label, use_cache, prefill, warmup in SCENARIOS:
+        results = []
+        for _ in range(runs):
+            cache_dir = tempfile.mkdtemp() if use_cache else None
+            try:
+                if prefill:
+                    run(cache_dir, True)
+                results.append(run(cache_dir, warmup))
+            finally:
+                if cache_dir:
+                    shutil.rmtree(cache_dir)
+        results.sort(key=lambda result: result['ttfb'])
+        median = results[len(results) // 2]
+        print('{:<30} {:>11.1f} {:>10.1f} {:>13.1f} {:>9.1f}'.format(
+            label, median['startup'] * 1000, median['warmup'] * 1000,
+            median['first'] * 1000, median['ttfb'] * 1000))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
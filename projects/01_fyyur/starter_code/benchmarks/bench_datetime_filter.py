@@ -0,0 +1,72 @@
+""" Time to render pages/shows.html with the datetime filter, against the
+previous parse-every-string filter.
+
+Usage: python benchmarks/bench_datetime_filter.py [num_rows]
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+import common  # noqa: F401 (sys.path)
+from app import app, format_datetime
+
+ROUNDS = 5
+
+
+def legacy_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+class Rows(list):
+    next_cursor = None
+
+
+def make_rows(num_rows, as_string):
+    start = datetime(2026, 1, 1, 20, 0)
+    rows = Rows()
+    for n in range(num_rows):
+        # a few shows share each slot, as on a busy night
+        start_time = start + timedelta(hours=n // 4)
+        rows.append({"venue_id": n % 500 + 1,
+                     "venue_name": 'Venue {}'.format(n % 500),
+                     "artist_id": n % 900 + 1,
+                     "artist_name": 'Artist {}'.format(n % 900),
+                     "artist_image_link": 'https://example.com/{}.jpg'.format(n),
+                     "start_time": str(start_time) if as_string else start_time})
+    return rows
+
+
+def render(rows):
+    template = app.jinja_env.get_template('pages/shows.html')
+    best = None
+    for _ in range(ROUNDS):
+        with app.test_request_context('/shows'):
+            start = time.perf_counter()
+            html = template.render(shows=rows)
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, html
+
+
+def main(num_rows):
+    filters = app.jinja_env.filters
+    filters['datetime'] = legacy_format_datetime
+    legacy_ms, legacy_html = render(make_rows(num_rows, as_string=True))
+    filters['datetime'] = format_datetime
+    current_ms, current_html = render(make_rows(num_rows, as_string=False))
+    assert legacy_html == current_html
+
+    print('{:>8} {:>12} {:>12}'.format('rows', 'legacy ms', 'current ms'))
+    print('{:>8} {:>12.1f} {:>12.1f}'.format(num_rows, legacy_ms, current_ms))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
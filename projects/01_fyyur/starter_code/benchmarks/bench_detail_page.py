@@ -0,0 +1,53 @@
+""" Statements issued by the venue detail page as its show count grows.
+
+Usage: python benchmarks/bench_detail_page.py [max_shows]
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+
+from common import make_app, count_queries
+from Models import db, Venue, Artist, Show_Table
+from details import detail_page
+
+NUM_ARTISTS = 100
+
+
+def seed(num_shows):
+    db.drop_all()
+    db.create_all()
+    venue = Venue(name='Bench Venue', city='City', state='CA')
+    db.session.add(venue)
+    db.session.bulk_insert_mappings(Artist, [{'name': 'Artist {}'.format(n)}
+                                             for n in range(NUM_ARTISTS)])
+    db.session.flush()
+    artist_ids = [r.id for r in db.session.query(Artist.id)]
+    now = datetime.today()
+    db.session.bulk_insert_mappings(Show_Table, [
+        {'venue_id': venue.id,
+         'artist_id': artist_ids[n % NUM_ARTISTS],
+         'start_time': now + timedelta(hours=n - num_shows // 2)}
+        for n in range(num_shows)])
+    db.session.commit()
+    return venue.id
+
+
+def main(max_shows):
+    app = make_app()
+    with app.app_context():
+        print('{:>8} {:>8} {:>10}'.format('shows', 'queries', 'ms'))
+        num_shows = 10
+        while num_shows <= max_shows:
+            venue_id = seed(num_shows)
+            db.session.expunge_all()
+            with count_queries() as counter:
+                start = time.perf_counter()
+                data = detail_page(Venue, venue_id)
+                elapsed = (time.perf_counter() - start) * 1000
+            assert data['upcoming_shows_count'] + data['past_shows_count'] == num_shows
+            print('{:>8} {:>8} {:>10.1f}'.format(num_shows, counter.count, elapsed))
+            num_shows *= 10
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
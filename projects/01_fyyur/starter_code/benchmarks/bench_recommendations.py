@@ -0,0 +1,76 @@
+""" Suggestion refreshes as profiles grow: a full refresh, an incremental one
+after a single artist changes, and reading one stored list.
+
+Usage: python benchmarks/bench_recommendations.py [max_profiles]
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from common import make_app, count_queries
+from Models import db, Venue, Artist, Show_Table, Genre, venue_genres, artist_genres
+from recommendations import refresh_suggestions, suggestions
+
+GENRES = ['Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk',
+          'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop',
+          'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul', 'Other']
+PLACES = [('City {}'.format(n), state) for n, state in enumerate(['CA', 'NY', 'TX', 'WA'] * 25)]
+SHOWS_PER_ARTIST = 3
+
+
+def seed(num_profiles, rng):
+    db.drop_all()
+    db.create_all()
+    db.session.bulk_insert_mappings(Genre, [{'name': name} for name in GENRES])
+    for model, seeking in ((Venue, 'seeking_talent'), (Artist, 'seeking_venue')):
+        db.session.bulk_insert_mappings(model, [
+            dict(zip(('city', 'state'), rng.choice(PLACES)),
+                 name='{} {}'.format(model.__name__, n), **{seeking: rng.random() < 0.7})
+            for n in range(num_profiles)])
+    genre_ids = [genre_id for (genre_id,) in db.session.query(Genre.id)]
+    for table, key in ((venue_genres, 'venue_id'), (artist_genres, 'artist_id')):
+        db.session.execute(table.insert(), [{key: record_id, 'genre_id': genre_id}
+                                            for record_id in range(1, num_profiles + 1)
+                                            for genre_id in rng.sample(genre_ids, rng.randint(1, 3))])
+    now = datetime.today()
+    db.session.bulk_insert_mappings(Show_Table, [
+        {'artist_id': artist_id, 'venue_id': rng.randint(1, num_profiles),
+         'start_time': now - timedelta(days=rng.randint(1, 365))}
+        for artist_id in range(1, num_profiles + 1) for _ in range(SHOWS_PER_ARTIST)])
+    db.session.commit()
+
+
+def timed(function, *args, **kwargs):
+    with count_queries() as counter:
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        db.session.commit()
+        elapsed = (time.perf_counter() - start) * 1000
+    return result, counter.count, elapsed
+
+
+def main(max_profiles):
+    rng = random.Random(0)
+    app = make_app()
+    with app.app_context():
+        print('{:>9} {:>10} {:>13} {:>10} {:>9} {:>8}'.format(
+            'profiles', 'full ms', 'one edit ms', 'rewritten', 'read ms', 'queries'))
+        num_profiles = 100
+        while num_profiles <= max_profiles:
+            seed(num_profiles, rng)
+            _, _, full = timed(refresh_suggestions, full=True)
+
+            artist = Artist.query.get(1)
+            artist.city, artist.state = rng.choice(PLACES)
+            db.session.commit()
+            rewritten, _, incremental = timed(refresh_suggestions)
+
+            _, queries, read = timed(suggestions, Artist, 1)
+            print('{:>9} {:>10.1f} {:>13.1f} {:>10} {:>9.2f} {:>8}'.format(
+                num_profiles, full, incremental, sum(map(len, rewritten.values())), read, queries))
+            num_profiles *= 10
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
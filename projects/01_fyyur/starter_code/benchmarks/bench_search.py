@@ -0,0 +1,50 @@
+""" Latency of the indexed venue name search.
+
+Usage: python benchmarks/bench_search.py [num_venues] [database_uri]
+"""
+import random
+import sys
+import time
+
+from common import make_app
+from Models import db, Venue
+from search import search_by_name
+
+WORDS = ['blue', 'note', 'hall', 'park', 'club', 'room', 'cellar', 'garden',
+         'theatre', 'lounge', 'house', 'tavern', 'arena', 'bowl', 'loft']
+TERMS = ['hall', 'blue note', 'cellar', 'xyzzy', 'tav', 'garden lo']
+BATCH = 50000
+RUNS = 50
+
+
+def seed(num_venues):
+    db.drop_all()
+    db.create_all()
+    rnd = random.Random(0)
+    for start in range(0, num_venues, BATCH):
+        db.session.bulk_insert_mappings(Venue, [
+            {'name': '{} {} {}'.format(rnd.choice(WORDS), rnd.choice(WORDS), n),
+             'city': 'City', 'state': 'CA'}
+            for n in range(start, min(start + BATCH, num_venues))])
+    db.session.commit()
+
+
+def main(num_venues, database_uri):
+    app = make_app(database_uri)
+    with app.app_context():
+        seed(num_venues)
+        print('{:>12} {:>10} {:>8} {:>8}'.format('term', 'matches', 'p50 ms', 'max ms'))
+        for term in TERMS:
+            timings = []
+            for _ in range(RUNS):
+                start = time.perf_counter()
+                results = search_by_name(Venue, term)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            print('{:>12} {:>10} {:>8.1f} {:>8.1f}'.format(
+                term, results['count'], timings[len(timings) // 2], timings[-1]))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+         sys.argv[2] if len(sys.argv) > 2 else 'sqlite:////tmp/fyyur_bench.db')
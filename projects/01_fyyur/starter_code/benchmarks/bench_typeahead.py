@@ -0,0 +1,53 @@
+""" Typeahead lookup latency and memory per entry as the index grows.
+
+Usage: python benchmarks/bench_typeahead.py [max_names]
+"""
+import random
+import sys
+import time
+
+import common  # noqa: F401 (sys.path)
+from typeahead import PrefixIndex
+
+LOOKUPS = 20000
+WORDS = ['the', 'musical', 'hop', 'dueling', 'pianos', 'bar', 'park', 'square',
+         'live', 'music', 'coffee', 'guns', 'n', 'petals', 'matt', 'quevedo',
+         'wild', 'sax', 'band', 'hall', 'club', 'room', 'jazz', 'blues', 'café']
+
+
+def make_names(num_names, rnd):
+    return [(n + 1, ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 4)))
+             + ' {}'.format(n)) for n in range(num_names)]
+
+
+def main(max_names):
+    rnd = random.Random(0)
+    print('{:>9} {:>9} {:>9} {:>9} {:>12}'.format(
+        'names', 'build s', 'p50 ms', 'p99 ms', 'bytes/entry'))
+    num_names = 1000
+    while num_names <= max_names:
+        names = make_names(num_names, rnd)
+        index = PrefixIndex()
+        start = time.perf_counter()
+        index.build(names)
+        build_s = time.perf_counter() - start
+
+        # prefixes as typed: 1 to 6 leading characters of a random word
+        prefixes = [rnd.choice(WORDS)[:rnd.randint(1, 6)] for _ in range(LOOKUPS)]
+        timings = []
+        for prefix in prefixes:
+            start = time.perf_counter()
+            index.search(prefix)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+
+        print('{:>9} {:>9.2f} {:>9.3f} {:>9.3f} {:>12.0f}'.format(
+            num_names, build_s,
+            timings[len(timings) // 2] * 1000,
+            timings[int(len(timings) * 0.99)] * 1000,
+            index.stats()['bytes_per_entry']))
+        num_names *= 10
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
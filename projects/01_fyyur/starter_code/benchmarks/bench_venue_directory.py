@@ -0,0 +1,52 @@
+""" Round trips and wall time of the /venues directory as cities grow.
+
+Usage: python benchmarks/bench_venue_directory.py [max_cities]
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+
+from common import make_app, count_queries
+from Models import db, Venue, Artist, Show_Table
+from directory import venue_directory
+
+VENUES_PER_CITY = 3
+
+
+def seed(num_cities):
+    db.drop_all()
+    db.create_all()
+    artist = Artist(name='Bench Artist', city='City 0', state='CA')
+    db.session.add(artist)
+    db.session.flush()
+
+    now = datetime.today()
+    venues = [{'name': 'Venue {}-{}'.format(c, v), 'city': 'City {}'.format(c), 'state': 'CA'}
+              for c in range(num_cities) for v in range(VENUES_PER_CITY)]
+    db.session.bulk_insert_mappings(Venue, venues)
+    venue_ids = [r.id for r in db.session.query(Venue.id)]
+    shows = [{'venue_id': venue_id, 'artist_id': artist.id,
+              'start_time': now + timedelta(days=offset)}
+             for venue_id in venue_ids for offset in (-7, 7, 14)]
+    db.session.bulk_insert_mappings(Show_Table, shows)
+    db.session.commit()
+
+
+def main(max_cities):
+    app = make_app()
+    with app.app_context():
+        print('{:>8} {:>8} {:>10}'.format('cities', 'queries', 'ms'))
+        num_cities = 10
+        while num_cities <= max_cities:
+            seed(num_cities)
+            with count_queries() as counter:
+                start = time.perf_counter()
+                areas = venue_directory()
+                elapsed = (time.perf_counter() - start) * 1000
+            assert len(areas) == num_cities
+            print('{:>8} {:>8} {:>10.1f}'.format(num_cities, counter.count, elapsed))
+            num_cities *= 10
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,129 @@
+from bisect import bisect_right, insort
+from datetime import timedelta
+from sqlalchemy import DDL, event
+from Models import db, Venue, Artist, Show_Table, visible
+
+# ----------------------------------------------------------------------------#
+# Booking conflicts.
+#
+# A show occupies its venue and its artist for SHOW_DURATION from start_time,
+# so two shows of the same venue (or artist) conflict when they start less
+# than SHOW_DURATION apart. Single shows are checked with an index range scan
+# on (venue_id, start_time) / (artist_id, start_time); bulk loads check
+# against an in-memory BookingIndex. On Postgres an exclusion constraint also
+# catches bookings that race past the check.
+# ----------------------------------------------------------------------------#
+
+SHOW_DURATION = timedelta(hours=3)
+
+# Show_Table foreign key -> (model, error message)
+BOOKED = {
+    'venue_id': (Venue, 'The venue already has a show at {:%Y-%m-%d %H:%M}.'),
+    'artist_id': (Artist, 'The artist already has a show at {:%Y-%m-%d %H:%M}.'),
+}
+
+POSTGRES_EXCLUSION_DDL = [
+    'CREATE EXTENSION IF NOT EXISTS btree_gist',
+] + [
+    'ALTER TABLE "Show_Table" ADD CONSTRAINT "ex_Show_Table_{key}_booking" '
+    'EXCLUDE USING gist ({key} WITH =, '
+    'tsrange(start_time, start_time + interval \'{hours} hours\') WITH &&)'
+    .format(key=key, hours=int(SHOW_DURATION.total_seconds() // 3600))
+    for key in BOOKED
+]
+
+
+def booking_constraint_ddl(dialect):
+    """ DDL statements that add the booking exclusion constraints. """
+    return POSTGRES_EXCLUSION_DDL if dialect == 'postgresql' else []
+
+
+for _statement in POSTGRES_EXCLUSION_DDL:
+    event.listen(Show_Table.__table__, 'after_create',
+                 DDL(_statement).execute_if(dialect='postgresql'))
+
+
+def find_conflicts(venue_id, artist_id, start_time, exclude_id=None):
+    """ Validation errors for booking a show, as {field: [message]}: unknown
+    venue or artist, or a show of either within SHOW_DURATION of start_time.
+    """
+    errors = _unknown(venue_id, artist_id)
+    for key, record_id in (('venue_id', venue_id), ('artist_id', artist_id)):
+        if key in errors:
+            continue
+        _, message = BOOKED[key]
+        column = getattr(Show_Table, key)
+        query = db.session.query(Show_Table.start_time) \
+            .filter(column == record_id,
+                    Show_Table.start_time > start_time - SHOW_DURATION,
+                    Show_Table.start_time < start_time + SHOW_DURATION)
+        if exclude_id is not None:
+            query = query.filter(Show_Table.id != exclude_id)
+        clash = query.order_by(Show_Table.start_time).first()
+        if clash is not None:
+            errors.setdefault('start_time', []).append(message.format(clash.start_time))
+    return errors
+
+
+def find_series_conflicts(venue_id, artist_id, start_times):
+    """ find_conflicts() for a series of shows of one venue and artist,
+    checked together against a BookingIndex (and each other).
+    """
+    errors = _unknown(venue_id, artist_id)
+    if errors:
+        return errors
+    shows = [{'venue_id': venue_id, 'artist_id': artist_id, 'start_time': start_time}
+             for start_time in start_times]
+    bookings = BookingIndex(shows)
+    for show in shows:
+        for field, message in bookings.conflicts(show):
+            errors.setdefault(field, []).append(message)
+        bookings.add(show)
+    return errors
+
+
+def _unknown(venue_id, artist_id):
+    errors = {}
+    for key, record_id in (('venue_id', venue_id), ('artist_id', artist_id)):
+        model, _ = BOOKED[key]
+        if db.session.query(model.id).filter(model.id == record_id, visible(model)).first() is None:
+            errors[key] = ['No such {}.'.format(model.__name__.lower())]
+    return errors
+
+
+class BookingIndex:
+    """ Sorted start times per venue and per artist, loaded for a batch of
+    shows, so each show in the batch is checked in O(log n).
+    """
+
+    def __init__(self, shows):
+        """ shows: mappings with venue_id, artist_id and start_time. """
+        self.starts = {key: {} for key in BOOKED}
+        if not shows:
+            return
+        earliest = min(show['start_time'] for show in shows) - SHOW_DURATION
+        latest = max(show['start_time'] for show in shows) + SHOW_DURATION
+        for key in BOOKED:
+            column = getattr(Show_Table, key)
+            booked = db.session.query(column, Show_Table.start_time) \
+                .filter(column.in_({show[key] for show in shows}),
+                        Show_Table.start_time > earliest,
+                        Show_Table.start_time < latest) \
+                .order_by(column, Show_Table.start_time)
+            for record_id, start_time in booked:
+                self.starts[key].setdefault(record_id, []).append(start_time)
+
+    def conflicts(self, show):
+        """ [(field, message)] for show against the index. """
+        errors = []
+        for key, (_, message) in BOOKED.items():
+            starts = self.starts[key].get(show[key], [])
+            # first start strictly after the window opens
+            position = bisect_right(starts, show['start_time'] - SHOW_DURATION)
+            if position < len(starts) and starts[position] < show['start_time'] + SHOW_DURATION:
+                errors.append(('start_time', message.format(starts[position])))
+        return errors
+
+    def add(self, show):
+        for key in BOOKED:
+            insort(self.starts[key].setdefault(show[key], []), show['start_time'])
@@ -0,0 +1,247 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone
+from functools import wraps
+from urllib.parse import urlencode
+from flask import current_app, g, request, session, Response
+from routing import REPLICA, STICKY_KEY
+
+# ----------------------------------------------------------------------------#
+# Page cache.
+#
+# Rendered GET pages are cached by path and query string. While rendering, a
+# view tags its page with the records it shows (add_cache_tags); write
+# handlers then invalidate exactly the pages carrying the tags they touched.
+#
+# With a read replica, a page rendered from the replica just after a write
+# may predate it: such pages aren't stored while any of their tags was
+# invalidated less than REPLICA_STICKY_SECONDS (the assumed replica lag)
+# ago, and a client sticking to the primary after its own write bypasses
+# the cache altogether.
+# ----------------------------------------------------------------------------#
+
+
+# rebuilt from the body on a hit, or per user
+UNCACHED_HEADERS = frozenset(['content-type', 'content-length', 'set-cookie'])
+
+
+class MemoryBackend:
+    """ Per-process LRU with a TTL. """
+
+    def __init__(self, maxsize, ttl, lag):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lag = lag
+        self._entries = OrderedDict()  # key -> (expires, value, tags)
+        self._tags = {}  # tag -> set of keys
+        self._invalidated = {}  # tag -> end of its replica lag window
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, tags):
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, tags):
+        with self._lock:
+            now = time.monotonic()
+            self._invalidated = {tag: until for tag, until in self._invalidated.items()
+                                 if until > now}
+            for tag in tags:
+                self._invalidated[tag] = now + self.lag
+                for key in self._tags.pop(tag, ()):
+                    self._discard(key)
+
+    def recently_invalidated(self, tags):
+        """ Whether any of tags was invalidated within the replica lag. """
+        with self._lock:
+            now = time.monotonic()
+            return any(self._invalidated.get(tag, 0) > now for tag in tags)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """ Shared between workers; needs the optional redis package. """
+
+    def __init__(self, url, ttl, lag, prefix='fyyur:page:'):
+        import redis
+        self.redis = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.lag = lag
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.redis.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, tags):
+        pipe = self.redis.pipeline()
+        pipe.set(self.prefix + key, pickle.dumps(value), ex=self.ttl)
+        for tag in tags:
+            pipe.sadd(self.prefix + 'tag:' + tag, key)
+            pipe.expire(self.prefix + 'tag:' + tag, self.ttl)
+        pipe.execute()
+
+    def invalidate(self, tags):
+        for tag in tags:
+            tag_key = self.prefix + 'tag:' + tag
+            keys = [self.prefix + key.decode() for key in self.redis.smembers(tag_key)]
+            self.redis.delete(tag_key, *keys)
+            if self.lag > 0:
+                self.redis.set(self.prefix + 'invalidated:' + tag, 1, px=int(self.lag * 1000))
+
+    def recently_invalidated(self, tags):
+        """ Whether any of tags was invalidated within the replica lag. """
+        tags = list(tags)
+        return bool(tags) and self.redis.exists(
+            *(self.prefix + 'invalidated:' + tag for tag in tags)) > 0
+
+    def __len__(self):
+        return sum(1 for key in self.redis.scan_iter(self.prefix + '*')
+                   if not key.startswith(((self.prefix + 'tag:').encode(),
+                                          (self.prefix + 'invalidated:').encode())))
+
+
+def add_cache_tags(*tags):
+    """ Tag the page being rendered, for PageCache.invalidate(). """
+    if 'cache_tags' in g:
+        g.cache_tags.update(tags)
+
+
+class PageCache:
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['page_cache'] = self
+        app.config.setdefault('PAGE_CACHE_BACKEND', 'memory')
+        app.config.setdefault('PAGE_CACHE_SIZE', 1024)
+        app.config.setdefault('PAGE_CACHE_TTL', 60)
+        lag = app.config.get('REPLICA_STICKY_SECONDS', 10)
+        if app.config['PAGE_CACHE_BACKEND'] == 'redis':
+            self.backend = RedisBackend(app.config['PAGE_CACHE_URL'], app.config['PAGE_CACHE_TTL'], lag)
+        else:
+            self.backend = MemoryBackend(app.config['PAGE_CACHE_SIZE'], app.config['PAGE_CACHE_TTL'], lag)
+
+    @staticmethod
+    def key():
+        return '{}?{}'.format(request.path, urlencode(sorted(request.args.items(multi=True))))
+
+    def cached(self, *static_tags):
+        """ Cache a GET view's 200 responses, tagged with static_tags plus
+        whatever the view adds with add_cache_tags().
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                # pages carrying flashed messages are per user, and a client
+                # that just wrote reads the primary, past any cached page
+                if session.get('_flashes') or session.get(STICKY_KEY, 0) > time.time():
+                    return view(*args, **kwargs)
+
+                key = self.key()
+                value = self.backend.get(key)
+                if value is not None:
+                    self.hits += 1
+                    body, mimetype, headers = value
+                    return Response(body, mimetype=mimetype, headers=headers)
+                self.misses += 1
+
+                g.cache_tags = set(static_tags)
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed \
+                        and not (g.get('db_bind') == REPLICA
+                                 and self.backend.recently_invalidated(g.cache_tags)):
+                    headers = [(name, value) for name, value in response.headers
+                               if name.lower() not in UNCACHED_HEADERS]
+                    self.backend.set(key, (response.get_data(), response.mimetype, headers),
+                                     g.cache_tags)
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *tags):
+        self.backend.invalidate(tags)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'backend': type(self.backend).__name__,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else None,
+                'size': len(self.backend)}
+
+
+def conditional(validators):
+    """ Conditional GET for a view: validators(**view_kwargs) returns (ETag,
+    Last-Modified), or None to leave the request to the view (a 404, say).
+    A request whose validators match gets an empty 304 without the view
+    running; other responses carry both validators.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # pages carrying flashed messages are per user
+            if session.get('_flashes'):
+                return view(*args, **kwargs)
+            current = validators(**kwargs)
+            if current is None:
+                return view(*args, **kwargs)
+            etag, last_modified = current
+
+            # If-None-Match takes precedence over If-Modified-Since (RFC 7232 6)
+            since = request.if_modified_since
+            if request.if_none_match:
+                not_modified = etag in request.if_none_match
+            elif since is not None:
+                not_modified = last_modified.replace(microsecond=0) <= since.replace(tzinfo=timezone.utc)
+            else:
+                not_modified = False
+            if not_modified:
+                response = Response(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            # browsers revalidate every time, which is now cheap
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,167 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from Models import db, Venue, Artist, Show_Table, visible
+from bookings import SHOW_DURATION
+
+# ----------------------------------------------------------------------------#
+# Venue / artist calendars.
+#
+# Shows of one venue or artist starting in [from, to), read with a range scan
+# of (venue_id, start_time) / (artist_id, start_time) and streamed as JSON or
+# iCalendar. The ETag covers the number of shows in the range, their latest
+# updated_at and that of the venues / artists they list, so adding, moving
+# or deleting a show, or renaming a counterpart, changes it.
+# ----------------------------------------------------------------------------#
+
+DEFAULT_DAYS = 7
+MAX_DAYS = 366
+FETCH_SIZE = 100
+
+# model -> (its Show_Table foreign key, the model on the other side of each
+#           show, that model's Show_Table foreign key)
+SIDES = {
+    Venue: ('venue_id', Artist, 'artist_id'),
+    Artist: ('artist_id', Venue, 'venue_id'),
+}
+
+
+def parse_range(start, end, today=None):
+    """ (from, to) naive local datetimes from the query string values (an
+    offset, if given, is converted), and a dict of validation errors.
+    """
+    errors = {}
+    values = {}
+    for field, value in (('from', start), ('to', end)):
+        if not value:
+            values[field] = None
+            continue
+        try:
+            values[field] = datetime.fromisoformat(value)
+        except ValueError:
+            errors[field] = ['Not a valid date or datetime.']
+            continue
+        if values[field].tzinfo is not None:
+            # show times are naive local time, like datetime.today()
+            values[field] = values[field].astimezone().replace(tzinfo=None)
+    if errors:
+        return None, None, errors
+
+    if today is None:
+        today = datetime.combine(datetime.today(), datetime.min.time())
+    start = values['from'] or today
+    end = values['to'] or start + timedelta(days=DEFAULT_DAYS)
+    if end <= start:
+        errors['to'] = ['Must be after from.']
+    elif end - start > timedelta(days=MAX_DAYS):
+        errors['to'] = ['The range is limited to {} days.'.format(MAX_DAYS)]
+    return start, end, errors
+
+
+class Calendar:
+    """ The shows of one venue or artist in [start, end). """
+
+    def __init__(self, model, entity_id, start, end):
+        self.model = model
+        self.entity_id = entity_id
+        self.start = start
+        self.end = end
+        key, self.other_model, self.other_key = SIDES[model]
+        self.column = getattr(Show_Table, key)
+
+    def in_range(self, query):
+        query = query.filter(self.column == self.entity_id,
+                             Show_Table.start_time >= self.start,
+                             Show_Table.start_time < self.end)
+        deleted_at = getattr(self.other_model, 'deleted_at', None)
+        if deleted_at is not None:
+            # shows at deleted venues that haven't been purged yet
+            hidden = db.session.query(self.other_model.id).filter(deleted_at.isnot(None))
+            query = query.filter(getattr(Show_Table, self.other_key).notin_(hidden))
+        return query
+
+    def etag(self, variant):
+        """ ETag of the range in one representation (variant), or None if
+        there is no such entity.
+        """
+        other_id = getattr(Show_Table, self.other_key)
+        exists, count, latest, others_latest = db.session.query(
+            db.session.query(self.model.id)
+            .filter(self.model.id == self.entity_id, visible(self.model)).exists(),
+            self.in_range(db.session.query(db.func.count(Show_Table.id))).scalar_subquery(),
+            self.in_range(db.session.query(db.func.max(Show_Table.updated_at))).scalar_subquery(),
+            self.in_range(db.session.query(db.func.max(self.other_model.updated_at))
+                          .select_from(Show_Table)
+                          .join(self.other_model, self.other_model.id == other_id)).scalar_subquery()
+        ).one()
+        if not exists:
+            return None
+        token = '{}:{}:{}:{}:{}:{}:{}:{}'.format(self.model.__name__, self.entity_id,
+                                                self.start.isoformat(), self.end.isoformat(),
+                                                variant, count, latest, others_latest)
+        return hashlib.sha1(token.encode()).hexdigest()
+
+    def __iter__(self):
+        other_id = getattr(Show_Table, self.other_key)
+        rows = self.in_range(db.session.query(Show_Table.id,
+                                              Show_Table.start_time,
+                                              Show_Table.updated_at,
+                                              other_id,
+                                              self.other_model.name)) \
+            .join(self.other_model, self.other_model.id == other_id) \
+            .order_by(Show_Table.start_time, Show_Table.id) \
+            .yield_per(FETCH_SIZE)
+        prefix = self.other_key[:-len('_id')]
+        for show_id, start_time, updated_at, record_id, name in rows:
+            yield {'id': show_id,
+                   'start_time': start_time,
+                   'end_time': start_time + SHOW_DURATION,
+                   'updated_at': updated_at,
+                   prefix + '_id': record_id,
+                   prefix + '_name': name}
+
+    def json_chunks(self):
+        yield '{{"{}": {}, "from": "{}", "to": "{}", "shows": ['.format(
+            SIDES[self.model][0], self.entity_id, self.start.isoformat(), self.end.isoformat())
+        for n, show in enumerate(self):
+            show = dict(show, start_time=show['start_time'].isoformat(),
+                        end_time=show['end_time'].isoformat())
+            del show['updated_at']
+            yield (',' if n else '') + json.dumps(show)
+        yield ']}'
+
+    def ical_chunks(self, summary):
+        """ summary: format string taking the show dict. """
+        yield ical_lines(['BEGIN:VCALENDAR',
+                          'VERSION:2.0',
+                          'PRODID:-//Fyyur//Calendar//EN',
+                          'CALSCALE:GREGORIAN'])
+        for show in self:
+            yield ical_lines(['BEGIN:VEVENT',
+                              'UID:show-{}@fyyur'.format(show['id']),
+                              'DTSTAMP:' + show['updated_at'].strftime('%Y%m%dT%H%M%SZ'),
+                              'DTSTART:' + show['start_time'].strftime('%Y%m%dT%H%M%S'),
+                              'DTEND:' + show['end_time'].strftime('%Y%m%dT%H%M%S'),
+                              'SUMMARY:' + ical_escape(summary.format(**show)),
+                              'END:VEVENT'])
+        yield ical_lines(['END:VCALENDAR'])
+
+
+def ical_escape(text):
+    return text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,') \
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def ical_lines(lines):
+    """ CRLF-terminated content lines, folded at 75 octets (RFC 5545 3.1). """
+    folded = []
+    for line in lines:
+        encoded = line.encode()
+        while len(encoded) > 75:
+            cut = 75
+            while encoded[cut] & 0xC0 == 0x80:  # don't split a UTF-8 sequence
+                cut -= 1
+            folded.append(encoded[:cut].decode())
+            encoded = b' ' + encoded[cut:]
+        folded.append(encoded.decode())
+    return ''.join(line + '\r\n' for line in folded)
@@ -8,4 +8,54 @@ DEBUG = True
 
 # Connect to the database
 SQLALCHEMY_DATABASE_URI = 'postgresql://postgres@localhost:5432/fyyurapp'
-SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Read replica: when set, GET requests read from it and writes go to the
+# primary; a client that just wrote reads the primary for
+# REPLICA_STICKY_SECONDS. Two SQLite files work for trying it locally.
+# SQLALCHEMY_BINDS = {'replica': 'postgresql://postgres@localhost:5433/fyyurapp'}
+REPLICA_STICKY_SECONDS = 10
+
+# Connection pool per database ('primary' or a bind name)
+DATABASE_POOL_OPTIONS = {
+    'primary': {'pool_size': 5, 'max_overflow': 10, 'pool_recycle': 1800},
+    'replica': {'pool_size': 10, 'max_overflow': 20, 'pool_recycle': 1800},
+}
+
+# Page cache: 'memory' is per process; 'redis' is shared between workers
+# and needs the redis package
+PAGE_CACHE_BACKEND = 'memory'
+PAGE_CACHE_URL = 'redis://localhost:6379/0'
+PAGE_CACHE_SIZE = 1024
+PAGE_CACHE_TTL = 60
+
+# Link static files by their hashed /assets/ URLs from `flask assets build`;
+# off in development so edits under static/ show up without a rebuild
+ASSETS_HASHED_URLS = not DEBUG
+
+# Compiled templates, shared by the workers on a host; every template is
+# loaded when a worker starts, before it takes requests
+TEMPLATE_CACHE_DIR = os.path.join(basedir, '.jinja_cache')
+TEMPLATE_WARMUP = True
+# build the /typeahead index in the background once the server is up, not
+# on its first lookup
+TYPEAHEAD_WARMUP = True
+
+# Expose the /_debug endpoints
+DEBUG_ENDPOINTS = DEBUG
+
+# Per-request SQL profiling for /_debug/metrics, with a sampled JSON log line
+# per request; statements repeated N_PLUS_ONE times in a request are flagged
+QUERY_PROFILER = DEBUG
+QUERY_PROFILER_LOG_RATE = 0.01
+QUERY_PROFILER_N_PLUS_ONE = 5
+
+# JSON-lines log written off the request thread (when not in debug); rotated
+# at LOG_ROTATE_WHEN or LOG_MAX_BYTES, whichever comes first
+LOG_FILE = 'fyyur.log'
+LOG_LEVEL = 'INFO'
+LOG_MAX_BYTES = 50 * 1024 * 1024
+LOG_ROTATE_WHEN = 'midnight'
+LOG_BACKUP_COUNT = 14
+LOG_QUEUE_SIZE = 10000
+LOG_REQUEST_SAMPLE_RATE = 0.1
@@ -0,0 +1,185 @@
+from collections import Counter
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, event, or_
+from Models import db, Venue, Artist, Show_Table
+
+# ----------------------------------------------------------------------------#
+# Denormalized show counters.
+#
+# Venue/Artist.upcoming_shows_count and past_shows_count are maintained
+# incrementally so listing and search pages can read them without joining
+# Show_Table. Show_Table.is_upcoming records which counter a show is tallied
+# in; shows with no start_time are not tallied at all.
+# ----------------------------------------------------------------------------#
+
+COUNTER_COLUMNS = ('upcoming_shows_count', 'past_shows_count')
+
+# (parent model, Show_Table foreign key)
+PARENTS = ((Venue, Show_Table.venue_id),
+           (Artist, Show_Table.artist_id))
+
+
+def _counter_column(show):
+    if show.is_upcoming is None:
+        return None
+    return 'upcoming_shows_count' if show.is_upcoming else 'past_shows_count'
+
+
+def _bump(connection, show, delta):
+    column = _counter_column(show)
+    if column is None:
+        return
+    for model, key in ((Venue, show.venue_id), (Artist, show.artist_id)):
+        table = model.__table__
+        connection.execute(table.update()
+                           .where(table.c.id == key)
+                           .values({column: table.c[column] + delta}))
+
+
+@event.listens_for(Show_Table, 'before_insert')
+def _classify_show(mapper, connection, target):
+    if target.start_time is None:
+        target.is_upcoming = None
+    else:
+        target.is_upcoming = target.start_time >= datetime.today()
+
+
+@event.listens_for(Show_Table, 'after_insert')
+def _count_inserted_show(mapper, connection, target):
+    _bump(connection, target, 1)
+
+
+@event.listens_for(Show_Table, 'after_delete')
+def _count_deleted_show(mapper, connection, target):
+    _bump(connection, target, -1)
+
+
+def count_bulk_inserted_shows(shows):
+    """ Counter updates for shows inserted without the ORM (bulk inserts skip
+    the mapper events). shows are mappings with venue_id, artist_id and
+    is_upcoming; one executemany UPDATE is issued per parent table.
+    """
+    _count_bulk_shows(shows, 1)
+
+
+def count_bulk_deleted_shows(shows):
+    """ Counter updates for shows deleted without the ORM; see
+    count_bulk_inserted_shows().
+    """
+    _count_bulk_shows(shows, -1)
+
+
+def _count_bulk_shows(shows, sign):
+    for model, fk in PARENTS:
+        deltas = Counter()
+        for show in shows:
+            if show['is_upcoming'] is not None:
+                deltas[show[fk.key], show['is_upcoming']] += sign
+        if not deltas:
+            continue
+
+        table = model.__table__
+        parent_ids = {parent_id for (parent_id, _) in deltas}
+        db.session.execute(
+            table.update()
+            .where(table.c.id == bindparam('parent_id'))
+            .values(upcoming_shows_count=table.c.upcoming_shows_count + bindparam('upcoming'),
+                    past_shows_count=table.c.past_shows_count + bindparam('past')),
+            [{'parent_id': parent_id,
+              'upcoming': deltas[parent_id, True],
+              'past': deltas[parent_id, False]}
+             for parent_id in parent_ids])
+
+
+def rollover_shows(now=None, cache_tags=None):
+    """ Move shows whose start_time has passed from the upcoming to the past
+    counters. Returns the number of shows rolled over; the caller commits,
+    then invalidates the page cache tags added to cache_tags (a set).
+    """
+    if now is None:
+        now = datetime.today()
+
+    due = db.and_(Show_Table.is_upcoming == True,  # noqa: E712
+                  Show_Table.start_time < now)
+
+    if cache_tags is not None:
+        for venue_id, artist_id in db.session.query(Show_Table.venue_id, Show_Table.artist_id) \
+                .filter(due) \
+                .distinct():
+            cache_tags.update(('venues', 'artists',
+                               'venue:{}'.format(venue_id), 'artist:{}'.format(artist_id)))
+
+    for model, fk in PARENTS:
+        num_due = db.session.query(db.func.count(Show_Table.id)) \
+            .filter(fk == model.id, due) \
+            .scalar_subquery()
+        db.session.query(model) \
+            .filter(model.id.in_(db.session.query(fk).filter(due))) \
+            .update({model.upcoming_shows_count: model.upcoming_shows_count - num_due,
+                     model.past_shows_count: model.past_shows_count + num_due},
+                    synchronize_session=False)
+
+    return db.session.query(Show_Table) \
+        .filter(due) \
+        .update({Show_Table.is_upcoming: False}, synchronize_session=False)
+
+
+def rebuild_show_counters(now=None):
+    """ Recompute every counter from Show_Table. Returns the number of drifted
+    rows that were corrected per table; the caller commits.
+    """
+    if now is None:
+        now = datetime.today()
+
+    db.session.query(Show_Table) \
+        .update({Show_Table.is_upcoming: Show_Table.start_time >= now},
+                synchronize_session=False)
+
+    drifted = {}
+    for model, fk in PARENTS:
+        upcoming = db.session.query(db.func.count(Show_Table.id)) \
+            .filter(fk == model.id, Show_Table.start_time >= now) \
+            .scalar_subquery()
+        past = db.session.query(db.func.count(Show_Table.id)) \
+            .filter(fk == model.id, Show_Table.start_time < now) \
+            .scalar_subquery()
+        drifted[model.__tablename__] = db.session.query(model) \
+            .filter(or_(model.upcoming_shows_count != upcoming,
+                        model.past_shows_count != past)) \
+            .update({model.upcoming_shows_count: upcoming,
+                     model.past_shows_count: past},
+                    synchronize_session=False)
+    return drifted
+
+
+# ----------------------------------------------------------------------------#
+# Commands.
+# ----------------------------------------------------------------------------#
+
+counters_cli = AppGroup('counters', help='Maintain the denormalized show counters.')
+
+
+@counters_cli.command('rollover')
+def rollover_command():
+    """Move started shows from upcoming to past. Run from cron."""
+    cache_tags = set()
+    num_shows = rollover_shows(cache_tags=cache_tags)
+    db.session.commit()
+
+    # reaches the web workers with the redis page cache backend only
+    page_cache = current_app.extensions.get('page_cache')
+    if page_cache is not None:
+        page_cache.invalidate(*cache_tags)
+    click.echo('Rolled over {} show(s).'.format(num_shows))
+
+
+@counters_cli.command('rebuild')
+def rebuild_command():
+    """Check the counters against Show_Table and rebuild them."""
+    drifted = rebuild_show_counters()
+    db.session.commit()
+    for table, num_rows in drifted.items():
+        click.echo('{}: {} row(s) out of sync, rebuilt.'.format(table, num_rows))
@@ -0,0 +1,130 @@
+import time
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from Models import db, Venue, Venue_Deletion, Show_Table
+from counters import count_bulk_deleted_shows
+
+# ----------------------------------------------------------------------------#
+# Venue deletion.
+#
+# Deleting a venue only sets Venue.deleted_at, which hides it from listings,
+# search, detail pages and calendars at once, and queues a Venue_Deletion.
+# `flask venues purge` then deletes the venue's shows CHUNK_SIZE at a time,
+# one short transaction per chunk, and finally the Venue row itself, so no
+# request or lock has to wait on a venue with thousands of shows. Progress
+# is kept in Venue_Deletion and served by /venues/<id>/deletion.
+# ----------------------------------------------------------------------------#
+
+CHUNK_SIZE = 500
+
+
+def soft_delete_venue(venue_id):
+    """ Hide the venue and queue the purge of its shows. Returns the
+    Venue_Deletion, or None if there is no such (visible) venue; the caller
+    commits.
+    """
+    venue = Venue.query.filter(Venue.id == venue_id, Venue.deleted_at.is_(None)).one_or_none()
+    if venue is None:
+        return None
+    venue.deleted_at = datetime.utcnow()
+    deletion = Venue_Deletion(
+        venue_id=venue.id,
+        shows_total=db.session.query(db.func.count(Show_Table.id))
+        .filter(Show_Table.venue_id == venue.id).scalar())
+    db.session.add(deletion)
+    return deletion
+
+
+def purge_chunk(deletion, chunk_size=CHUNK_SIZE, cache_tags=None):
+    """ Delete up to chunk_size shows of the deleted venue, or the venue itself
+    once it has none left. Returns the number of shows deleted; the caller
+    commits, then invalidates the page cache tags added to cache_tags (a
+    set).
+    """
+    if cache_tags is None:
+        cache_tags = set()
+    cache_tags.update(('venues', 'venue:{}'.format(deletion.venue_id)))
+    shows = db.session.query(Show_Table.id,
+                             Show_Table.venue_id,
+                             Show_Table.artist_id,
+                             Show_Table.is_upcoming) \
+        .filter(Show_Table.venue_id == deletion.venue_id) \
+        .limit(chunk_size) \
+        .all()
+    if shows:
+        db.session.query(Show_Table) \
+            .filter(Show_Table.id.in_([show.id for show in shows])) \
+            .delete(synchronize_session=False)
+        count_bulk_deleted_shows([show._asdict() for show in shows])
+        cache_tags.add('artists')
+        cache_tags.update('artist:{}'.format(show.artist_id) for show in shows)
+        deletion.shows_deleted += len(shows)
+        return len(shows)
+
+    venue = Venue.query.get(deletion.venue_id)
+    if venue is not None:
+        db.session.delete(venue)
+    deletion.finished_at = datetime.utcnow()
+    return 0
+
+
+def purge_deleted_venues(chunk_size=CHUNK_SIZE, cache_tags=None):
+    """ Work through the queued deletions oldest first, committing after every
+    chunk. Returns (venues purged, shows deleted), and adds the page cache
+    tags to invalidate to cache_tags (a set). On Postgres concurrent workers
+    skip the deletion another one has locked.
+    """
+    num_venues = num_shows = 0
+    while True:
+        deletion = Venue_Deletion.query \
+            .filter(Venue_Deletion.finished_at.is_(None)) \
+            .order_by(Venue_Deletion.requested_at) \
+            .with_for_update(skip_locked=True) \
+            .first()
+        if deletion is None:
+            return num_venues, num_shows
+        num_shows += purge_chunk(deletion, chunk_size, cache_tags)
+        if deletion.finished_at is not None:
+            num_venues += 1
+        db.session.commit()
+
+
+def deletion_progress(deletion):
+    return {'venue_id': deletion.venue_id,
+            'shows_total': deletion.shows_total,
+            'shows_deleted': deletion.shows_deleted,
+            'requested_at': deletion.requested_at.isoformat(),
+            'finished_at': deletion.finished_at.isoformat() if deletion.finished_at else None,
+            'done': deletion.finished_at is not None}
+
+
+# ----------------------------------------------------------------------------#
+# Commands.
+# ----------------------------------------------------------------------------#
+
+venues_cli = AppGroup('venues', help='Venue maintenance.')
+
+
+@venues_cli.command('purge')
+@click.option('--chunk-size', default=CHUNK_SIZE, show_default=True)
+@click.option('--watch', type=float, metavar='SECONDS',
+              help='Keep running, checking for new deletions every SECONDS.')
+def purge_command(chunk_size, watch):
+    """Delete the shows and rows of deleted venues. Run from cron, or as a
+    worker with --watch.
+    """
+    while True:
+        cache_tags = set()
+        num_venues, num_shows = purge_deleted_venues(chunk_size, cache_tags)
+        # reaches the web workers with the redis page cache backend only
+        page_cache = current_app.extensions.get('page_cache')
+        if page_cache is not None:
+            page_cache.invalidate(*cache_tags)
+        if num_venues or num_shows or not watch:
+            click.echo('Purged {} venue(s), {} show(s).'.format(num_venues, num_shows))
+        if not watch:
+            return
+        db.session.remove()
+        time.sleep(watch)
@@ -0,0 +1,135 @@
+import hashlib
+from datetime import datetime, timezone
+from sqlalchemy.orm import configure_mappers, selectinload
+from Models import db, Venue, Artist, Show_Table, visible
+from recommendations import SIDES, suggestions
+
+
+# ----------------------------------------------------------------------------#
+# Venue / Artist detail pages.
+# ----------------------------------------------------------------------------#
+
+# model -> (Show_Table backref to the other side of each show, template key prefix)
+COUNTERPARTS = {
+    Venue: ('artists', 'artist'),
+    Artist: ('venues', 'venue'),
+}
+
+
+def detail_page(model, entity_id, now=None):
+    """ Assemble the show_venue / show_artist template data.
+
+    The entity, its genres, its shows and each show's artist (or venue) are
+    loaded in three queries however many shows there are: one for the
+    entity, one selectinload of its genres and one selectinload of the shows
+    joined to their counterpart. Shows are split into upcoming and past in
+    a single pass.
+
+    Returns None if there is no such entity, or it has been deleted.
+    """
+    if now is None:
+        now = datetime.today()
+    counterpart, prefix = COUNTERPARTS[model]
+
+    # the backrefs only exist once the mappers are configured, which may not
+    # have happened yet if this is the first query of the process
+    configure_mappers()
+    relationship = getattr(Show_Table, counterpart)
+    other_model = relationship.property.mapper.class_
+
+    entity = db.session.query(model) \
+        .options(selectinload(model.shows)
+                 .joinedload(relationship)
+                 .lazyload(other_model.genre_list),
+                 selectinload(model.genre_list)) \
+        .filter(model.id == entity_id, visible(model)) \
+        .one_or_none()
+    if entity is None:
+        return None
+
+    data = {key: getattr(entity, key) for key in model.__table__.columns.keys()}
+    data["genres"] = entity.genres
+
+    upcoming_shows, past_shows = [], []
+    for show in sorted((s for s in entity.shows if s.start_time is not None),
+                       key=lambda s: s.start_time):
+        other = getattr(show, counterpart)
+        if getattr(other, 'deleted_at', None) is not None:
+            # a deleted venue whose shows haven't been purged yet
+            continue
+        element = {prefix + "_id": other.id,
+                   prefix + "_name": other.name,
+                   prefix + "_image_link": other.image_link,
+                   "start_time": show.start_time}
+        if show.start_time >= now:
+            upcoming_shows.append(element)
+        else:
+            past_shows.append(element)
+    past_shows.reverse()
+
+    data["upcoming_shows"] = upcoming_shows
+    data["upcoming_shows_count"] = len(upcoming_shows)
+    data["past_shows"] = past_shows
+    data["past_shows_count"] = len(past_shows)
+    data["suggestions"] = suggestions(model, entity_id)
+    return data
+
+
+def detail_validators(model, entity_id, now=None):
+    """ (ETag, Last-Modified) of the entity's detail page, from one aggregate
+    query over the entity, its shows and their counterparts, without loading
+    any of them. None if there is no such entity.
+
+    The ETag changes whenever the page would: the entity or a counterpart is
+    updated (their updated_at), a show is added, moved or deleted (the show
+    count and latest Show_Table.updated_at), or a show moves from upcoming to
+    past as time goes by (the upcoming count). Adding or deleting a show also
+    bumps the parents' updated_at through their counters, and the most
+    recent past start_time covers the last move to past, so Last-Modified
+    alone is a valid validator too. A refresh that rewrites the entity's
+    suggestions sets their refreshed_at, and editing or deleting a suggested
+    record its updated_at.
+    """
+    if now is None:
+        now = datetime.today()
+    counterpart, _ = COUNTERPARTS[model]
+    configure_mappers()
+    relationship = getattr(Show_Table, counterpart)
+    other_model = relationship.property.mapper.class_
+    side = SIDES[model]
+    refreshed_at = db.session.query(db.func.max(side.table.refreshed_at)) \
+        .filter(side.owner_key == entity_id) \
+        .scalar_subquery()
+    suggested_updated_at = db.session.query(db.func.max(side.other.updated_at)) \
+        .join(side.table, side.other_key == side.other.id) \
+        .filter(side.owner_key == entity_id) \
+        .scalar_subquery()
+
+    row = db.session.query(model.updated_at,
+                           db.func.count(Show_Table.id),
+                           db.func.count(db.case([(Show_Table.start_time >= now, Show_Table.id)])),
+                           db.func.max(Show_Table.updated_at),
+                           db.func.max(other_model.updated_at),
+                           db.func.max(db.case([(Show_Table.start_time < now, Show_Table.start_time)])),
+                           refreshed_at,
+                           suggested_updated_at) \
+        .outerjoin(model.shows) \
+        .outerjoin(relationship) \
+        .filter(model.id == entity_id, visible(model)) \
+        .group_by(model.id, model.updated_at) \
+        .one_or_none()
+    if row is None:
+        return None
+
+    updated_at, num_shows, num_upcoming, shows_updated_at, others_updated_at, last_start, \
+        suggested_at, suggested_updated_at = row
+    token = '{}:{}:{}:{}:{}:{}:{}:{}:{}'.format(model.__name__, entity_id, updated_at, num_shows,
+                                                num_upcoming, shows_updated_at, others_updated_at,
+                                                suggested_at, suggested_updated_at)
+    changes = [value.replace(tzinfo=timezone.utc)
+               for value in (updated_at, shows_updated_at, others_updated_at, suggested_at,
+                             suggested_updated_at) if value]
+    if last_start is not None:
+        # start times are local, like datetime.today()
+        changes.append(last_start.astimezone(timezone.utc))
+    return hashlib.sha1(token.encode()).hexdigest(), max(changes)
@@ -0,0 +1,41 @@
+from itertools import groupby
+from Models import db, Venue, Genre, venue_genres
+
+
+# ----------------------------------------------------------------------------#
+# Venue directory.
+# ----------------------------------------------------------------------------#
+
+def venue_directory(genre=None):
+    """ Build the /venues listing: every (city, state) area with its venues
+    and their upcoming show counts, from a single query. If genre is given
+    only venues of that genre are listed.
+
+    Upcoming show counts are read from the denormalized counter column
+    (see counters.py), so no join on Show_Table is needed. Soft-deleted
+    venues are left out, which ix_Venue_city_state_name (a partial index)
+    already does.
+    """
+    query = db.session.query(Venue.id,
+                             Venue.name,
+                             Venue.city,
+                             Venue.state,
+                             Venue.upcoming_shows_count) \
+        .filter(Venue.deleted_at.is_(None))
+    if genre:
+        query = query \
+            .join(venue_genres) \
+            .join(Genre) \
+            .filter(Genre.name == genre)
+    query = query.order_by(Venue.city, Venue.state, Venue.name, Venue.id)
+
+    areas = []
+    for (city, state), rows in groupby(query.all(), key=lambda r: (r[2], r[3])):
+        venue_lst = [{"id": venue_id,
+                      "name": name,
+                      "num_upcoming_shows": num_upcoming_shows}
+                     for (venue_id, name, _, _, num_upcoming_shows) in rows]
+        areas.append({'city': city,
+                      'state': state,
+                      'venues': venue_lst})
+    return areas
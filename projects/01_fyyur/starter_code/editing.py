@@ -0,0 +1,67 @@
+from counters import COUNTER_COLUMNS
+
+# ----------------------------------------------------------------------------#
+# Edit submissions.
+#
+# Only the fields that differ from the loaded row are assigned, so the UPDATE
+# carries just those columns (and none at all for an unchanged form). Venue
+# and Artist have a version_id_col: the edit form posts back the version it
+# was loaded from, and the UPDATE only matches that version.
+# ----------------------------------------------------------------------------#
+
+# columns an edit form doesn't post
+NOT_EDITABLE = frozenset(('id', 'version', 'updated_at', 'deleted_at', 'latitude', 'longitude')
+                         + COUNTER_COLUMNS)
+BOOLEAN_FIELDS = frozenset(['seeking_talent', 'seeking_venue'])
+
+STALE_MESSAGE = ('{} {} was changed by someone else while you were editing it. '
+                 'Please check the current details and edit again.')
+
+
+def form_values(model, form):
+    """ The column values an edit form submits for model, from request.form. """
+    values = {}
+    for key in model.__table__.columns.keys():
+        if key in NOT_EDITABLE:
+            continue
+        if key in BOOLEAN_FIELDS:
+            values[key] = form.get(key) == 'True'
+        else:
+            values[key] = form.get(key)
+    return values
+
+
+def is_stale(record, form):
+    """ Whether the form was loaded from an older version of record. Forms
+    that don't post a version are only protected at flush time.
+    """
+    version = form.get('version', type=int)
+    return version is not None and version != record.version
+
+
+def _blank_as_none(value):
+    # a nullable column left empty is NULL or '' depending on how the row was
+    # written, and comes back from the form as ''
+    return None if value == '' else value
+
+
+def apply_form_changes(record, form):
+    """ Assign the fields of form that differ from record. Returns the names
+    of the changed fields; the caller commits.
+    """
+    changed = []
+    for key, value in form_values(type(record), form).items():
+        if _blank_as_none(getattr(record, key)) != _blank_as_none(value):
+            setattr(record, key, value)
+            changed.append(key)
+
+    genres = form.getlist('genres')
+    if sorted(genres) != sorted(record.genres):
+        record.genres = genres
+        if not changed:
+            # genres live in an association table; still bump the version
+            # (and updated_at), without rewriting a column that has triggers
+            # and listeners, such as name
+            record.version = record.version + 1
+        changed.append('genres')
+    return changed
@@ -1,8 +1,10 @@
-from datetime import datetime
+from datetime import date, datetime
 from flask_wtf import FlaskForm as Form
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, DateField, IntegerField, HiddenField, TextAreaField
 from wtforms.validators import DataRequired, InputRequired, AnyOf, URL
 import re
+from bookings import find_conflicts, find_series_conflicts
+from recurrence import FREQUENCIES, MAX_OCCURRENCES, expand_occurrences
 
 state_choices = [
     ('AL', 'AL'),
@@ -81,6 +83,9 @@ genres_choices = [
     ('Other', 'Other'),
 ]
 
+phone_regex = re.compile(r'^\(?([0-9]{3})\)?[-. ]?([0-9]{3})[-. ]?([0-9]{4})$')
+
+
 def is_valid_phone(number):
     """ Validate phone numbers like:
     1234567890 - no space
@@ -95,15 +100,14 @@ def is_valid_phone(number):
 
     Note: (? = optional) - Learn more: https://regex101.com/
     """
-    regex = re.compile('^\(?([0-9]{3})\)?[-. ]?([0-9]{3})[-. ]?([0-9]{4})$')
-    return regex.match(number)
+    return phone_regex.match(number)
 
 class ShowForm(Form):
-    artist_id = StringField(
-        'artist_id'
+    artist_id = IntegerField(
+        'artist_id', validators=[InputRequired()]
     )
-    venue_id = StringField(
-        'venue_id'
+    venue_id = IntegerField(
+        'venue_id', validators=[InputRequired()]
     )
     start_time = DateTimeField(
         'start_time',
@@ -111,6 +115,65 @@ class ShowForm(Form):
         default= datetime.today()
     )
 
+    def validate(self):
+        """ Field validators, then the booking checks: the venue and artist
+        exist and neither is booked within SHOW_DURATION of start_time.
+        """
+        if not super().validate():
+            return False
+        conflicts = find_conflicts(self.venue_id.data, self.artist_id.data, self.start_time.data)
+        for field, messages in conflicts.items():
+            getattr(self, field).errors.extend(messages)
+        return not conflicts
+
+
+class RecurringShowForm(ShowForm):
+    frequency = SelectField(
+        'frequency', validators=[DataRequired()],
+        choices=[(frequency, frequency.capitalize()) for frequency in FREQUENCIES]
+    )
+    until = DateField(
+        'until', validators=[DataRequired()]
+    )
+    # YYYY-MM-DD dates, separated by commas or new lines
+    skip_dates = TextAreaField(
+        'skip_dates'
+    )
+
+    def validate(self):
+        """ Field validators, then the series is expanded into self.occurrences
+        and checked against existing bookings as a whole.
+        """
+        self.occurrences = []
+        if not Form.validate(self):
+            return False
+        try:
+            skip_dates = [date.fromisoformat(value)
+                          for value in re.split(r'[\s,]+', self.skip_dates.data or '') if value]
+        except ValueError:
+            self.skip_dates.errors.append('Dates must be YYYY-MM-DD.')
+            return False
+        if self.until.data < self.start_time.data.date():
+            self.until.errors.append('Must not be before the first show.')
+            return False
+
+        occurrences = expand_occurrences(self.start_time.data, self.frequency.data,
+                                         self.until.data, skip_dates)
+        if not occurrences:
+            self.skip_dates.errors.append('Every date of the series is skipped.')
+            return False
+        if len(occurrences) > MAX_OCCURRENCES:
+            self.until.errors.append('A series is limited to {} shows.'.format(MAX_OCCURRENCES))
+            return False
+
+        conflicts = find_series_conflicts(self.venue_id.data, self.artist_id.data, occurrences)
+        for field, messages in conflicts.items():
+            getattr(self, field).errors.extend(messages)
+        if conflicts:
+            return False
+        self.occurrences = occurrences
+        return True
+
 
 class VenueForm(Form):
     name = StringField(
@@ -141,6 +204,10 @@ class VenueForm(Form):
     seeking_description = StringField(
         'seeking_description'
     )
+    # the row version the edit form was loaded from (see edit_*_submission)
+    version = HiddenField(
+        'version'
+    )
 
     image_link = StringField(
         'image_link', validators=[URL()]
@@ -211,6 +278,10 @@ class ArtistForm(Form):
     seeking_description = StringField(
         'seeking_description'
     )
+    # the row version the edit form was loaded from (see edit_*_submission)
+    version = HiddenField(
+        'version'
+    )
 
     image_link = StringField(
         'image_link', validators=[URL()]
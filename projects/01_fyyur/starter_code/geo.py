@@ -0,0 +1,185 @@
+import csv
+import functools
+import math
+import os
+import click
+import numpy as np
+from sqlalchemy import event, inspect
+from Models import db, Venue
+from deletion import venues_cli
+from typeahead import normalize
+
+# ----------------------------------------------------------------------------#
+# Venues near a point.
+#
+# Venues are geocoded offline to the centroid of their city, from the table
+# bundled in data/city_centroids.csv: on insert, whenever city or state
+# changes, and in bulk with `flask venues geocode`. A radius search selects
+# the venues inside the radius's bounding box through
+# ix_Venue_latitude_longitude, then computes the exact haversine distance of
+# every candidate at once with NumPy, keeps those within the radius and
+# sorts them by distance.
+# ----------------------------------------------------------------------------#
+
+CENTROIDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'city_centroids.csv')
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+DEFAULT_RADIUS_KM = 25
+MAX_RADIUS_KM = 500
+LIMIT = 50
+
+
+@functools.lru_cache(maxsize=None)
+def centroids(path=CENTROIDS_PATH):
+    """ {(normalized city, state): (latitude, longitude)} """
+    with open(path, newline='') as stream:
+        return {(normalize(row['city']), row['state'].upper()):
+                (float(row['latitude']), float(row['longitude']))
+                for row in csv.DictReader(stream)}
+
+
+def geocode(city, state):
+    """ (latitude, longitude) of the city's centroid, or (None, None). """
+    return centroids().get((normalize(city), (state or '').upper()), (None, None))
+
+
+@event.listens_for(Venue, 'before_insert')
+@event.listens_for(Venue, 'before_update')
+def _geocode_venue(mapper, connection, target):
+    instance = inspect(target)
+    if instance.persistent:
+        if not (instance.attrs.city.history.has_changes()
+                or instance.attrs.state.history.has_changes()):
+            return
+    elif target.latitude is not None:
+        # given explicitly
+        return
+    target.latitude, target.longitude = geocode(target.city, target.state)
+
+
+def parse_center(args):
+    """ (latitude, longitude, radius_km) from lat=&lon= or city=&state=, and
+    radius_km=, with a dict of validation errors.
+    """
+    errors = {}
+    try:
+        radius_km = float(args.get('radius_km', DEFAULT_RADIUS_KM))
+        if not 0 < radius_km <= MAX_RADIUS_KM:
+            raise ValueError
+    except ValueError:
+        radius_km = None
+        errors['radius_km'] = ['Must be a number of km up to {}.'.format(MAX_RADIUS_KM)]
+
+    latitude = longitude = None
+    if args.get('city'):
+        latitude, longitude = geocode(args['city'], args.get('state'))
+        if latitude is None:
+            errors['city'] = ['Unknown city.']
+    else:
+        for field, bound in (('lat', 90), ('lon', 180)):
+            try:
+                value = float(args.get(field, ''))
+                if not -bound <= value <= bound:
+                    raise ValueError
+            except ValueError:
+                errors[field] = ['Must be a number between -{0} and {0}.'.format(bound)]
+                continue
+            if field == 'lat':
+                latitude = value
+            else:
+                longitude = value
+    return latitude, longitude, radius_km, errors
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """ (min latitude, max latitude, [(min longitude, max longitude)]) around
+    the circle; split in two where it crosses the antimeridian.
+    """
+    delta_latitude = radius_km / KM_PER_DEGREE
+    min_latitude = max(latitude - delta_latitude, -90.0)
+    max_latitude = min(latitude + delta_latitude, 90.0)
+    if min_latitude == -90.0 or max_latitude == 90.0:
+        return min_latitude, max_latitude, [(-180.0, 180.0)]
+
+    delta_longitude = math.degrees(math.asin(
+        min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(latitude)))))
+    west, east = longitude - delta_longitude, longitude + delta_longitude
+    if west < -180.0:
+        return min_latitude, max_latitude, [(west + 360.0, 180.0), (-180.0, east)]
+    if east > 180.0:
+        return min_latitude, max_latitude, [(west, 180.0), (-180.0, east - 360.0)]
+    return min_latitude, max_latitude, [(west, east)]
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """ Great-circle distances from one point to arrays of points. """
+    phi, lam = math.radians(latitude), math.radians(longitude)
+    phis, lams = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((phis - phi) / 2) ** 2 \
+        + math.cos(phi) * np.cos(phis) * np.sin((lams - lam) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def venues_near(latitude, longitude, radius_km, limit=LIMIT):
+    """ [{'id', 'name', 'city', 'state', 'distance_km', 'num_upcoming_shows'}]
+    of the nearest venues within radius_km, nearest first.
+    """
+    min_latitude, max_latitude, longitude_ranges = bounding_box(latitude, longitude, radius_km)
+    rows = db.session.query(Venue.id,
+                            Venue.name,
+                            Venue.city,
+                            Venue.state,
+                            Venue.upcoming_shows_count,
+                            Venue.latitude,
+                            Venue.longitude) \
+        .filter(Venue.deleted_at.is_(None),
+                Venue.latitude.between(min_latitude, max_latitude),
+                db.or_(*(Venue.longitude.between(west, east) for west, east in longitude_ranges))) \
+        .all()
+    if not rows:
+        return []
+
+    distances = haversine_km(latitude, longitude,
+                             np.fromiter((row.latitude for row in rows), float, len(rows)),
+                             np.fromiter((row.longitude for row in rows), float, len(rows)))
+    within = np.flatnonzero(distances <= radius_km)
+    nearest = within[np.argsort(distances[within], kind='stable')][:limit]
+    return [{'id': rows[n].id,
+             'name': rows[n].name,
+             'city': rows[n].city,
+             'state': rows[n].state,
+             'distance_km': round(float(distances[n]), 2),
+             'num_upcoming_shows': rows[n].upcoming_shows_count}
+            for n in nearest]
+
+
+# ----------------------------------------------------------------------------#
+# Commands.
+# ----------------------------------------------------------------------------#
+
+@venues_cli.command('geocode')
+@click.option('--all', 'everything', is_flag=True,
+              help='Redo venues that already have coordinates.')
+def geocode_command(everything):
+    """Set venue coordinates from the bundled city centroids."""
+    query = db.session.query(Venue.id, Venue.city, Venue.state)
+    if not everything:
+        query = query.filter(Venue.latitude.is_(None))
+    located, unknown = [], set()
+    for venue_id, city, state in query:
+        latitude, longitude = geocode(city, state)
+        if latitude is None:
+            unknown.add('{}, {}'.format(city, state))
+            continue
+        located.append({'venue_id': venue_id, 'lat': latitude, 'lon': longitude})
+
+    if located:
+        table = Venue.__table__
+        db.session.execute(table.update()
+                           .where(table.c.id == db.bindparam('venue_id'))
+                           .values(latitude=db.bindparam('lat'), longitude=db.bindparam('lon')),
+                           located)
+    db.session.commit()
+    click.echo('Geocoded {} venue(s).'.format(len(located)))
+    if unknown:
+        click.echo('No centroid for: {}'.format('; '.join(sorted(unknown))))
@@ -0,0 +1,326 @@
+import csv
+import io
+import json
+import os
+import time
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from wtforms.validators import URL
+from Models import db, Venue, Artist, Show_Table, Genre, venue_genres, artist_genres, visible
+from forms import phone_regex, state_choices, genres_choices
+from counters import count_bulk_inserted_shows
+from bookings import BookingIndex
+from geo import geocode
+
+# ----------------------------------------------------------------------------#
+# Bulk import.
+#
+# Rows are validated with the VenueForm / ArtistForm / ShowForm rules, without
+# building forms, and inserted CHUNK_SIZE at a time: COPY on Postgres, bulk
+# inserts elsewhere. Rejected rows go to a CSV error report.
+# ----------------------------------------------------------------------------#
+
+CHUNK_SIZE = 5000
+
+STATES = frozenset(dict(state_choices))
+GENRES = frozenset(dict(genres_choices))
+URL_REGEX = URL().regex
+URL_FIELDS = ('image_link', 'website', 'facebook_link')
+CHOICES = {'True': True, 'False': False, True: True, False: False}
+
+# kind -> (model, genre association table, association foreign key,
+#          required text fields, seeking flag)
+PROFILES = {
+    'venues': (Venue, venue_genres, 'venue_id', ('name', 'city', 'address'), 'seeking_talent'),
+    'artists': (Artist, artist_genres, 'artist_id', ('name', 'city'), 'seeking_venue'),
+}
+
+
+# ----------------------------------------------------------------------------#
+# Validation.
+# ----------------------------------------------------------------------------#
+
+def _text(row, field):
+    value = row.get(field)
+    return value.strip() if isinstance(value, str) else value
+
+
+def _genre_list(value):
+    if isinstance(value, str):
+        return [genre.strip() for genre in value.split(',') if genre.strip()]
+    return list(value or [])
+
+
+def validate_profile(row, required, flag):
+    """ VenueForm / ArtistForm rules. Returns (values, genres, errors). """
+    errors = []
+    values = {}
+    for field in required:
+        values[field] = _text(row, field)
+        if not values[field]:
+            errors.append((field, 'This field is required.'))
+
+    values['state'] = _text(row, 'state')
+    if values['state'] not in STATES:
+        errors.append(('state', 'Invalid state.'))
+
+    values['phone'] = _text(row, 'phone') or ''
+    if not phone_regex.match(values['phone']):
+        errors.append(('phone', 'Invalid phone.'))
+
+    for field in URL_FIELDS:
+        values[field] = _text(row, field) or ''
+        if not URL_REGEX.match(values[field]):
+            errors.append((field, 'Invalid URL.'))
+
+    values[flag] = CHOICES.get(_text(row, flag))
+    if values[flag] is None:
+        errors.append((flag, 'Not a valid choice'))
+    values['seeking_description'] = _text(row, 'seeking_description') or ''
+
+    genres = list(dict.fromkeys(_genre_list(row.get('genres'))))
+    if not genres:
+        errors.append(('genres', 'This field is required.'))
+    elif not GENRES.issuperset(genres):
+        errors.append(('genres', 'Invalid genres.'))
+
+    return values, genres, errors
+
+
+def validate_show(row):
+    """ ShowForm rules. Returns (values, errors). """
+    errors = []
+    values = {}
+    for field in ('venue_id', 'artist_id'):
+        value = row.get(field)
+        try:
+            if isinstance(value, (bool, float)):
+                # int() would truncate 1.5, and take true as 1
+                raise TypeError
+            values[field] = int(value)
+        except (TypeError, ValueError):
+            errors.append((field, 'Not a valid integer.'))
+    try:
+        values['start_time'] = datetime.fromisoformat(_text(row, 'start_time'))
+    except (TypeError, ValueError):
+        errors.append(('start_time', 'Not a valid datetime value'))
+    else:
+        if values['start_time'].tzinfo is not None:
+            # show times are naive local time, like datetime.today()
+            values['start_time'] = values['start_time'].astimezone().replace(tzinfo=None)
+    return values, errors
+
+
+# ----------------------------------------------------------------------------#
+# Loading.
+# ----------------------------------------------------------------------------#
+
+def _dialect():
+    return db.engine.dialect.name
+
+
+def allocate_ids(table, count):
+    """ Primary keys for count new rows, so association rows can be built
+    before the parents are inserted.
+    """
+    if _dialect() == 'postgresql':
+        return [row[0] for row in db.session.execute(
+            db.text("SELECT nextval('\"{}_id_seq\"') FROM generate_series(1, :count)".format(table.name)),
+            {'count': count})]
+    start = db.session.query(db.func.max(table.c.id)).scalar() or 0
+    return list(range(start + 1, start + count + 1))
+
+
+def insert_rows(table, rows):
+    if not rows:
+        return
+    if _dialect() == 'postgresql':
+        columns = list(rows[0])
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows([row[column] for column in columns] for row in rows)
+        buffer.seek(0)
+        cursor = db.session.connection().connection.cursor()
+        cursor.copy_expert('COPY "{}" ({}) FROM STDIN WITH (FORMAT csv)'.format(
+            table.name, ', '.join(columns)), buffer)
+    else:
+        db.session.execute(table.insert(), rows)
+
+
+class Importer:
+    """ Validates and loads one kind of record, chunk by chunk. """
+
+    def __init__(self, kind, report, chunk_size=CHUNK_SIZE):
+        self.kind = kind
+        self.report = report
+        self.chunk_size = chunk_size
+        self.imported = 0
+        self.rejected = 0
+        self.cache_tags = {kind}
+        self._genre_ids = None
+
+    def reject(self, line, errors):
+        self.rejected += 1
+        for field, message in errors:
+            self.report.writerow([line, field, message])
+
+    def run(self, rows):
+        """ rows: iterable of (line number, dict), as from read_rows(). """
+        chunk = []
+        for line, row in rows:
+            if isinstance(row, ValueError):
+                self.reject(line, [('*', 'Not valid JSON: {}'.format(row))])
+                continue
+            if not isinstance(row, dict):
+                self.reject(line, [('*', 'Not a JSON object.')])
+                continue
+            if self.kind == 'shows':
+                values, errors = validate_show(row)
+                record = values
+            else:
+                _, _, _, required, flag = PROFILES[self.kind]
+                values, genres, errors = validate_profile(row, required, flag)
+                record = (values, genres)
+            if errors:
+                self.reject(line, errors)
+                continue
+            chunk.append((line, record))
+            if len(chunk) >= self.chunk_size:
+                self.flush(chunk)
+                chunk = []
+        if chunk:
+            self.flush(chunk)
+
+    def flush(self, chunk):
+        try:
+            if self.kind == 'shows':
+                self.load_shows(chunk)
+            else:
+                self.load_profiles(chunk)
+            db.session.commit()
+        except Exception as error:
+            db.session.rollback()
+            message = str(error).splitlines()[0]
+            for line, _ in chunk:
+                self.reject(line, [('*', message)])
+
+    def genre_ids(self):
+        if self._genre_ids is None:
+            Genre.lookup(sorted(GENRES))
+            db.session.commit()
+            self._genre_ids = dict(db.session.query(Genre.name, Genre.id))
+        return self._genre_ids
+
+    def load_profiles(self, chunk):
+        model, association, fk, _, _ = PROFILES[self.kind]
+        genre_ids = self.genre_ids()
+        table = model.__table__
+
+        ids = allocate_ids(table, len(chunk))
+        parents, links = [], []
+        for record_id, (_, (values, genres)) in zip(ids, chunk):
+            parents.append(dict(values, id=record_id,
+                                upcoming_shows_count=0, past_shows_count=0))
+            if model is Venue:
+                # bulk inserts skip the geocoding mapper event
+                parents[-1]['latitude'], parents[-1]['longitude'] = \
+                    geocode(values['city'], values['state'])
+            links.extend({fk: record_id, 'genre_id': genre_ids[genre]} for genre in genres)
+
+        insert_rows(table, parents)
+        insert_rows(association, links)
+        self.imported += len(parents)
+
+    def load_shows(self, chunk):
+        # referential and booking checks for the whole chunk in four queries
+        known = {}
+        for model, field in ((Venue, 'venue_id'), (Artist, 'artist_id')):
+            wanted = {values[field] for (_, values) in chunk}
+            known[field] = {row[0] for row in
+                            db.session.query(model.id).filter(model.id.in_(wanted), visible(model))}
+
+        bookings = BookingIndex([values for (_, values) in chunk])
+        now = datetime.today()
+        shows = []
+        for line, values in chunk:
+            errors = [(field, 'No such record.') for field in ('venue_id', 'artist_id')
+                      if values[field] not in known[field]]
+            errors = errors or bookings.conflicts(values)
+            if errors:
+                self.reject(line, errors)
+                continue
+            bookings.add(values)
+            shows.append(dict(values, is_upcoming=values['start_time'] >= now))
+
+        insert_rows(Show_Table.__table__, shows)
+        count_bulk_inserted_shows(shows)
+        for show in shows:
+            self.cache_tags.add('venue:{}'.format(show['venue_id']))
+            self.cache_tags.add('artist:{}'.format(show['artist_id']))
+        self.imported += len(shows)
+
+
+def read_rows(stream, file_format):
+    """ Yields (line number, dict) from a CSV or JSON-lines stream; a line
+    that isn't valid JSON yields its ValueError instead, for the importer
+    to reject with the other invalid rows.
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line, text in enumerate(stream, 1):
+            if text.strip():
+                try:
+                    yield line, json.loads(text)
+                except ValueError as error:
+                    yield line, error
+
+
+# ----------------------------------------------------------------------------#
+# Commands.
+# ----------------------------------------------------------------------------#
+
+fyyur_cli = AppGroup('fyyur', help='Fyyur data management.')
+
+
+@fyyur_cli.command('import')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'jsonl']),
+              help='Defaults to the file extension.')
+@click.option('--chunk-size', default=CHUNK_SIZE, show_default=True)
+@click.option('--errors', 'errors_path', type=click.Path(dir_okay=False),
+              help='Error report, defaults to PATH.errors.csv.')
+def import_command(kind, path, file_format, chunk_size, errors_path):
+    """Import venues, artists or shows from a CSV or JSON-lines file.
+
+    Genres are a list in JSON lines and comma separated in CSV; shows
+    reference existing venue_id / artist_id values.
+    """
+    if file_format is None:
+        file_format = 'jsonl' if path.endswith(('.jsonl', '.json')) else 'csv'
+    errors_path = errors_path or path + '.errors.csv'
+
+    start = time.perf_counter()
+    with open(path, newline='') as stream, open(errors_path, 'w', newline='') as errors:
+        report = csv.writer(errors)
+        report.writerow(['line', 'field', 'error'])
+        importer = Importer(kind, report, chunk_size=chunk_size)
+        importer.run(read_rows(stream, file_format))
+    elapsed = time.perf_counter() - start
+
+    page_cache = current_app.extensions.get('page_cache')
+    if page_cache is not None:
+        page_cache.invalidate(*importer.cache_tags)
+
+    click.echo('{} {} imported, {} rejected in {:.1f}s ({:.0f} rows/s).'.format(
+        importer.imported, kind, importer.rejected, elapsed,
+        (importer.imported + importer.rejected) / elapsed if elapsed else 0))
+    if importer.rejected:
+        click.echo('Errors written to {}'.format(errors_path))
+    else:
+        os.remove(errors_path)
@@ -0,0 +1,165 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from flask import g, has_request_context, request
+from flask.logging import default_handler
+
+# ----------------------------------------------------------------------------#
+# Logging pipeline.
+#
+# Request threads only format records as JSON and put them on a bounded
+# queue; a QueueListener thread writes them to a file rotated by size and by
+# time. A slow disk fills the queue, after which records are dropped rather
+# than blocking requests.
+# ----------------------------------------------------------------------------#
+
+# LogRecord attributes that are not user supplied extra fields
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) \
+    | {'message', 'asctime', 'sample_rate'}
+
+
+class JSONFormatter(logging.Formatter):
+
+    def format(self, record):
+        entry = {'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+                 'level': record.levelname,
+                 'logger': record.name,
+                 'message': record.getMessage()}
+        entry.update((key, value) for key, value in vars(record).items()
+                     if key not in RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """ Adds the request id and route of the current request, if any. """
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.route = request.endpoint
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """ Keeps a record logged with extra={'sample_rate': r} with probability r;
+    records without a sample_rate are always kept.
+    """
+
+    def filter(self, record):
+        rate = getattr(record, 'sample_rate', None)
+        return rate is None or random.random() < rate
+
+
+class DroppingQueueHandler(QueueHandler):
+    """ Drops records instead of blocking when the queue is full. """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SizedTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """ Rolls over at the timed interval, or sooner once the file reaches
+    max_bytes. Rotated files never overwrite one another.
+    """
+
+    def __init__(self, filename, max_bytes, when='midnight', backup_count=14):
+        super().__init__(filename, when=when, backupCount=backup_count,
+                         encoding='utf-8', delay=True)
+        self.max_bytes = max_bytes
+        self.namer = self.unique_name
+
+    def shouldRollover(self, record):
+        if super().shouldRollover(record):
+            return True
+        return bool(self.max_bytes and self.stream is not None
+                    and self.stream.tell() >= self.max_bytes)
+
+    @staticmethod
+    def unique_name(name):
+        candidate, n = name, 0
+        while os.path.exists(candidate):
+            n += 1
+            candidate = '{}.{}'.format(name, n)
+        return candidate
+
+
+def _start_request():
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    g.request_start = time.perf_counter()
+
+
+def _tag_response(response):
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+        g.response_status = response.status_code
+    return response
+
+
+def _log_request(app):
+    def log_request(exc):
+        # runs once a streamed response has been fully sent
+        if 'request_start' not in g:
+            return
+        app.logger.info('request', extra={
+            'method': request.method,
+            'path': request.path,
+            'status': g.get('response_status', 500),
+            'latency_ms': round((time.perf_counter() - g.request_start) * 1000, 2),
+            'sample_rate': app.config['LOG_REQUEST_SAMPLE_RATE']})
+    return log_request
+
+
+def init_logging(app):
+    """ Route app.logger through the queue to LOG_FILE, with one sampled
+    'request' record per request. Returns the started QueueListener.
+    """
+    app.config.setdefault('LOG_FILE', 'fyyur.log')
+    app.config.setdefault('LOG_LEVEL', 'INFO')
+    app.config.setdefault('LOG_MAX_BYTES', 50 * 1024 * 1024)
+    app.config.setdefault('LOG_ROTATE_WHEN', 'midnight')
+    app.config.setdefault('LOG_BACKUP_COUNT', 14)
+    app.config.setdefault('LOG_QUEUE_SIZE', 10000)
+    app.config.setdefault('LOG_REQUEST_SAMPLE_RATE', 1.0)
+
+    file_handler = SizedTimedRotatingFileHandler(app.config['LOG_FILE'],
+                                                 app.config['LOG_MAX_BYTES'],
+                                                 when=app.config['LOG_ROTATE_WHEN'],
+                                                 backup_count=app.config['LOG_BACKUP_COUNT'])
+    # records arrive already formatted by the queue handler
+    file_handler.setFormatter(logging.Formatter('%(message)s'))
+
+    log_queue = queue.Queue(app.config['LOG_QUEUE_SIZE'])
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.setFormatter(JSONFormatter())
+    queue_handler.addFilter(SamplingFilter())
+    queue_handler.addFilter(RequestContextFilter())
+
+    app.logger.setLevel(app.config['LOG_LEVEL'])
+    # Flask's stderr handler would write on the request thread
+    app.logger.removeHandler(default_handler)
+    app.logger.addHandler(queue_handler)
+
+    app.before_request(_start_request)
+    app.after_request(_tag_response)
+    app.teardown_request(_log_request(app))
+
+    listener = QueueListener(log_queue, file_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
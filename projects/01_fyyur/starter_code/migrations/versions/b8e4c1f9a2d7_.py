@@ -0,0 +1,41 @@
+"""booking exclusion constraints
+
+Revision ID: b8e4c1f9a2d7
+Revises: 71d8b5e0f3a6
+Create Date: 2026-10-18 23:12:05.318274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e4c1f9a2d7'
+down_revision = '71d8b5e0f3a6'
+branch_labels = None
+depends_on = None
+
+# as bookings.py had them at this revision
+BOOKED_KEYS = ('venue_id', 'artist_id')
+
+POSTGRES_EXCLUSION_DDL = [
+    'CREATE EXTENSION IF NOT EXISTS btree_gist',
+] + [
+    'ALTER TABLE "Show_Table" ADD CONSTRAINT "ex_Show_Table_{key}_booking" '
+    'EXCLUDE USING gist ({key} WITH =, '
+    'tsrange(start_time, start_time + interval \'3 hours\') WITH &&)'.format(key=key)
+    for key in BOOKED_KEYS
+]
+
+
+def upgrade():
+    # fails if existing shows already double-book a venue or an artist
+    if op.get_bind().dialect.name == 'postgresql':
+        for statement in POSTGRES_EXCLUSION_DDL:
+            op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for key in BOOKED_KEYS:
+            op.execute('ALTER TABLE "Show_Table" DROP CONSTRAINT IF EXISTS "ex_Show_Table_{}_booking"'.format(key))
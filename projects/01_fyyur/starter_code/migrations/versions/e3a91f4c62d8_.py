@@ -0,0 +1,56 @@
+"""name search indexes
+
+Revision ID: e3a91f4c62d8
+Revises: 5b1e0c7d9a24
+Create Date: 2026-10-18 19:41:37.904215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a91f4c62d8'
+down_revision = '5b1e0c7d9a24'
+branch_labels = None
+depends_on = None
+
+TABLES = ('Venue', 'Artist')
+
+# as search.py had them at this revision
+SQLITE_FTS_DDL = [
+    'CREATE VIRTUAL TABLE IF NOT EXISTS "{table}_fts" USING fts5('
+    'name, content=\'{table}\', content_rowid=\'id\', tokenize=\'trigram\')',
+    'CREATE TRIGGER IF NOT EXISTS "{table}_fts_ai" AFTER INSERT ON "{table}" BEGIN '
+    'INSERT INTO "{table}_fts"(rowid, name) VALUES (new.id, new.name); END',
+    'CREATE TRIGGER IF NOT EXISTS "{table}_fts_ad" AFTER DELETE ON "{table}" BEGIN '
+    'INSERT INTO "{table}_fts"("{table}_fts", rowid, name) VALUES (\'delete\', old.id, old.name); END',
+    'CREATE TRIGGER IF NOT EXISTS "{table}_fts_au" AFTER UPDATE OF name ON "{table}" BEGIN '
+    'INSERT INTO "{table}_fts"("{table}_fts", rowid, name) VALUES (\'delete\', old.id, old.name); '
+    'INSERT INTO "{table}_fts"(rowid, name) VALUES (new.id, new.name); END',
+    'INSERT INTO "{table}_fts"("{table}_fts") VALUES (\'rebuild\')',
+]
+
+POSTGRES_TRGM_DDL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS "ix_{table}_name_trgm" ON "{table}" USING gin (name gin_trgm_ops)',
+]
+
+
+def upgrade():
+    statements = {'sqlite': SQLITE_FTS_DDL,
+                  'postgresql': POSTGRES_TRGM_DDL}.get(op.get_bind().dialect.name, [])
+    for table in TABLES:
+        for statement in statements:
+            op.execute(statement.format(table=table))
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table in TABLES:
+        if dialect == 'postgresql':
+            op.execute('DROP INDEX IF EXISTS "ix_{}_name_trgm"'.format(table))
+        elif dialect == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute('DROP TRIGGER IF EXISTS "{}_fts_{}"'.format(table, suffix))
+            op.execute('DROP TABLE IF EXISTS "{}_fts"'.format(table))
@@ -0,0 +1,131 @@
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ----------------------------------------------------------------------------#
+# Per-request SQL profiler.
+#
+# Cursor events on every Engine record each statement run while a request is
+# being handled. Per endpoint we keep the query count, the time spent in the
+# database and the statements repeated often enough to suggest an N+1 (one
+# lazy load per row of a listing, say).
+# ----------------------------------------------------------------------------#
+
+# expanded IN lists differ in length from one request to the next
+IN_LIST = re.compile(r'\bIN \([^()]*\)', re.IGNORECASE)
+WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(statement):
+    return IN_LIST.sub('IN (...)', WHITESPACE.sub(' ', statement).strip())
+
+
+class RequestProfile:
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+        self.status = None
+
+    def suspects(self, threshold):
+        """ Statements run at least threshold times: likely N+1 loads. """
+        return sorted(statement for statement, count in self.statements.items()
+                      if count >= threshold)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'query_profile' in g:
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _end_query(conn, cursor, statement, parameters, context, executemany):
+    if not (has_request_context() and 'query_profile' in g):
+        return
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+    profile = g.query_profile
+    profile.queries += 1
+    profile.db_time += time.perf_counter() - starts.pop()
+    profile.statements[fingerprint(statement)] += 1
+
+
+class QueryProfiler:
+
+    def __init__(self, app=None):
+        self.endpoints = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['query_profiler'] = self
+        app.config.setdefault('QUERY_PROFILER', False)
+        app.config.setdefault('QUERY_PROFILER_LOG_RATE', 0.0)
+        app.config.setdefault('QUERY_PROFILER_N_PLUS_ONE', 5)
+        self.app = app
+        if app.config['QUERY_PROFILER']:
+            app.before_request(self._before_request)
+            app.after_request(self._after_request)
+            app.teardown_request(self._teardown_request)
+
+    def _before_request(self):
+        g.query_profile = RequestProfile()
+
+    def _after_request(self, response):
+        if 'query_profile' in g:
+            g.query_profile.status = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        # runs once a streamed response has been fully sent
+        profile = g.pop('query_profile', None)
+        if profile is None or request.endpoint is None:
+            return
+        suspects = profile.suspects(self.app.config['QUERY_PROFILER_N_PLUS_ONE'])
+        self.record(request.endpoint, profile, suspects)
+        if random.random() < self.app.config['QUERY_PROFILER_LOG_RATE']:
+            self.log(profile, suspects)
+
+    def record(self, endpoint, profile, suspects):
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, {
+                'requests': 0, 'queries': 0, 'max_queries': 0,
+                'db_ms': 0.0, 'n_plus_one': Counter()})
+            stats['requests'] += 1
+            stats['queries'] += profile.queries
+            stats['max_queries'] = max(stats['max_queries'], profile.queries)
+            stats['db_ms'] += profile.db_time * 1000
+            stats['n_plus_one'].update(suspects)
+
+    def log(self, profile, suspects):
+        self.app.logger.log(logging.WARNING if suspects else logging.INFO, 'request_queries', extra={
+            'method': request.method,
+            'path': request.path,
+            'status': profile.status,
+            'queries': profile.queries,
+            'db_ms': round(profile.db_time * 1000, 2),
+            'n_plus_one': suspects})
+
+    def stats(self):
+        """ Per endpoint totals and means, with the statements flagged as
+        N+1 suspects and how many requests flagged them.
+        """
+        with self._lock:
+            return {endpoint: {'requests': stats['requests'],
+                               'queries': stats['queries'],
+                               'mean_queries': stats['queries'] / stats['requests'],
+                               'max_queries': stats['max_queries'],
+                               'db_ms': round(stats['db_ms'], 2),
+                               'mean_db_ms': round(stats['db_ms'] / stats['requests'], 2),
+                               'n_plus_one': dict(stats['n_plus_one'])}
+                    for endpoint, stats in self.endpoints.items()}
@@ -0,0 +1,320 @@
+import time
+from collections import namedtuple
+from datetime import datetime
+import click
+import numpy as np
+from flask import current_app
+from flask.cli import AppGroup
+from Models import (db, Venue, Artist, Show_Table, Genre, venue_genres, artist_genres, visible,
+                    Artist_Suggestion, Venue_Suggestion, Suggestion_Refresh)
+from typeahead import normalize
+
+# ----------------------------------------------------------------------------#
+# Artist / venue suggestions.
+#
+# An artist and a venue score on the overlap of their genres (Jaccard over
+# genre bit vectors), on being in the same state and city, and on the past
+# shows the artist played there. Artists are suggested the K best venues
+# seeking talent, venues the K best artists seeking a venue. The lists are
+# computed with NumPy, BLOCK_ROWS entities at a time, and stored in
+# Artist_Suggestion / Venue_Suggestion, where the detail pages read them by
+# primary key.
+#
+# `flask recommendations refresh` recomputes the lists of the profiles
+# updated since the previous run (a new show bumps updated_at through the
+# counters), plus the lists those profiles may now enter or leave: a list
+# holding a changed profile, or whose K-th score a changed profile now beats.
+# ----------------------------------------------------------------------------#
+
+K = 10
+BLOCK_ROWS = 1024
+WEIGHTS = {'genres': 0.6, 'state': 0.15, 'city': 0.1, 'history': 0.3}
+# past shows together for the full history score
+HISTORY_SATURATION = 4
+# scores are compared and stored to 4 decimals
+POINTS_PER_UNIT = 10000
+
+# model -> (suggestion table, its owner column, its suggested column,
+#           the model suggested, genre association column, seeking flag)
+Side = namedtuple('Side', 'table owner_key other_key other genre_key seeking')
+
+SIDES = {
+    Artist: Side(Artist_Suggestion, Artist_Suggestion.artist_id, Artist_Suggestion.venue_id,
+                 Venue, artist_genres.c.artist_id, Artist.seeking_venue),
+    Venue: Side(Venue_Suggestion, Venue_Suggestion.venue_id, Venue_Suggestion.artist_id,
+                Artist, venue_genres.c.venue_id, Venue.seeking_talent),
+}
+
+
+class Profiles:
+    """ Features of every visible artist or venue, as arrays in id order. """
+
+    def __init__(self, model, genre_positions, place_codes):
+        side = SIDES[model]
+        rows = db.session.query(model.id, model.city, model.state, side.seeking) \
+            .filter(visible(model)) \
+            .order_by(model.id) \
+            .all()
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.positions = {record_id: n for n, record_id in enumerate(self.ids.tolist())}
+        self.state = np.array([place_codes.setdefault(('', state), len(place_codes))
+                               for (_, _, state, _) in rows], dtype=np.int64)
+        self.city = np.array([place_codes.setdefault((normalize(city), state), len(place_codes))
+                              for (_, city, state, _) in rows], dtype=np.int64)
+        self.seeking = np.array([bool(seeking) for (_, _, _, seeking) in rows], dtype=bool)
+
+        self.genres = np.zeros((len(rows), len(genre_positions)), dtype=np.float32)
+        for record_id, genre_id in db.session.query(side.genre_key, side.genre_key.table.c.genre_id):
+            if record_id in self.positions:
+                self.genres[self.positions[record_id], genre_positions[genre_id]] = 1
+        self.genre_counts = self.genres.sum(axis=1)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class Matcher:
+
+    def __init__(self, now=None):
+        if now is None:
+            now = datetime.today()
+        genre_positions = {genre_id: n for n, (genre_id,) in
+                           enumerate(db.session.query(Genre.id).order_by(Genre.id))}
+        place_codes = {}
+        self.profiles = {model: Profiles(model, genre_positions, place_codes) for model in SIDES}
+
+        # model -> position -> (positions of the other side, past shows together)
+        pairs = db.session.query(Show_Table.artist_id, Show_Table.venue_id, db.func.count()) \
+            .filter(Show_Table.start_time < now) \
+            .group_by(Show_Table.artist_id, Show_Table.venue_id)
+        history = {Artist: {}, Venue: {}}
+        artists, venues = self.profiles[Artist].positions, self.profiles[Venue].positions
+        for artist_id, venue_id, num_shows in pairs:
+            if artist_id in artists and venue_id in venues:
+                history[Artist].setdefault(artists[artist_id], []).append((venues[venue_id], num_shows))
+                history[Venue].setdefault(venues[venue_id], []).append((artists[artist_id], num_shows))
+        self.history = {model: {position: (np.array([other for other, _ in shows]),
+                                           np.array([num for _, num in shows], dtype=np.float32))
+                                for position, shows in by_position.items()}
+                        for model, by_position in history.items()}
+
+    def points(self, model, positions, columns=None):
+        """ Scores, in POINTS_PER_UNIT (as stored), of the model rows at
+        positions (one row each) against the rows of the other side at
+        columns (all of them by default). Element-wise in float32 after an
+        exact 0/1 product, so a pair scores the same whichever rows are in
+        the block.
+        """
+        rows, other = self.profiles[model], self.profiles[SIDES[model].other]
+        if columns is None:
+            columns = np.arange(len(other))
+        scores = rows.genres[positions] @ other.genres[columns].T
+        union = rows.genre_counts[positions][:, None] + other.genre_counts[columns][None, :] - scores
+        np.divide(scores, np.maximum(union, 1, out=union), out=scores)
+        scores *= WEIGHTS['genres']
+        np.add(scores, WEIGHTS['state'], out=scores,
+               where=rows.state[positions][:, None] == other.state[columns][None, :])
+        np.add(scores, WEIGHTS['city'], out=scores,
+               where=rows.city[positions][:, None] == other.city[columns][None, :])
+
+        # other position -> index in columns
+        indexes = np.full(len(other), -1)
+        indexes[columns] = np.arange(len(columns))
+        for n, position in enumerate(positions):
+            if position in self.history[model]:
+                others, num_shows = self.history[model][position]
+                others = indexes[others]
+                scored = others >= 0
+                scores[n, others[scored]] += WEIGHTS['history'] * \
+                    np.minimum(num_shows[scored], HISTORY_SATURATION) / HISTORY_SATURATION
+        scores *= POINTS_PER_UNIT
+        return np.rint(scores, out=scores).astype(np.int64)
+
+    def top_k(self, model, ids):
+        """ {id: [(suggested id, score)]} for the visible ids of model. """
+        profiles, other = self.profiles[model], self.profiles[SIDES[model].other]
+        positions = sorted(profiles.positions[record_id] for record_id in ids
+                           if record_id in profiles.positions)
+        columns = np.flatnonzero(other.seeking)
+        k = min(K, len(columns))
+        if not k:
+            return {int(profiles.ids[position]): [] for position in positions}
+        lists = {}
+        for start in range(0, len(positions), BLOCK_ROWS):
+            block = positions[start:start + BLOCK_ROWS]
+            points = self.points(model, block, columns)
+            # ascending on (-points, column): ties go to the lower id, so a
+            # list doesn't depend on which rows were refreshed with it
+            keys = points * -len(columns)
+            keys += np.arange(len(columns))
+            best = np.argpartition(keys, k - 1, axis=1)[:, :k]
+            best = np.take_along_axis(best, np.argsort(np.take_along_axis(keys, best, axis=1), axis=1), axis=1)
+            best_points = np.take_along_axis(points, best, axis=1)
+            for n, position in enumerate(block):
+                lists[int(profiles.ids[position])] = [
+                    (int(other.ids[columns[column]]), int(score) / POINTS_PER_UNIT)
+                    for column, score in zip(best[n], best_points[n]) if score > 0]
+        return lists
+
+    def best_new_points(self, model, changed_ids):
+        """ For every row of model, the best points any of changed_ids (on the
+        other side, and seeking) would now have in its list.
+        """
+        other_model = SIDES[model].other
+        other = self.profiles[other_model]
+        positions = sorted(other.positions[record_id] for record_id in changed_ids
+                           if record_id in other.positions and other.seeking[other.positions[record_id]])
+        best = np.zeros(len(self.profiles[model]), dtype=np.int64)
+        for start in range(0, len(positions), BLOCK_ROWS):
+            best = np.maximum(best, self.points(other_model, positions[start:start + BLOCK_ROWS]).max(axis=0))
+        return best
+
+
+def affected_lists(matcher, model, changed_other_ids):
+    """ ids of model whose list may change because the profiles
+    changed_other_ids (of the other side) changed.
+    """
+    side = SIDES[model]
+    if not changed_other_ids:
+        return set()
+    affected = set()
+    changed_other_ids = list(changed_other_ids)
+    for start in range(0, len(changed_other_ids), BLOCK_ROWS):
+        affected.update(record_id for (record_id,) in db.session.query(side.owner_key.distinct())
+                        .filter(side.other_key.in_(changed_other_ids[start:start + BLOCK_ROWS])))
+
+    # lists a changed profile may now get into: it scores at least the K-th
+    # entry (a tie goes to the lower id), or the list isn't full
+    profiles = matcher.profiles[model]
+    thresholds = np.ones(len(profiles), dtype=np.int64)
+    for record_id, length, lowest in db.session.query(side.owner_key,
+                                                      db.func.count(),
+                                                      db.func.min(side.table.score)) \
+            .group_by(side.owner_key):
+        if length >= K and record_id in profiles.positions:
+            thresholds[profiles.positions[record_id]] = round(lowest * POINTS_PER_UNIT)
+    best = matcher.best_new_points(model, changed_other_ids)
+    affected.update(profiles.ids[best >= thresholds].tolist())
+    return affected
+
+
+def store_lists(model, ids, lists, now):
+    """ Rewrite the stored lists of ids that differ from lists (ids missing
+    from lists have theirs deleted). Returns the ids rewritten.
+    """
+    side = SIDES[model]
+    ids = list(ids)
+    rewritten = []
+    for start in range(0, len(ids), BLOCK_ROWS):
+        block = ids[start:start + BLOCK_ROWS]
+        stored = {}
+        for owner_id, other_id, score in db.session.query(side.owner_key, side.other_key, side.table.score) \
+                .filter(side.owner_key.in_(block)) \
+                .order_by(side.owner_key, side.table.rank):
+            stored.setdefault(owner_id, []).append((other_id, score))
+        changed = [owner_id for owner_id in block if stored.get(owner_id, []) != lists.get(owner_id, [])]
+        if not changed:
+            continue
+        db.session.query(side.table).filter(side.owner_key.in_(changed)) \
+            .delete(synchronize_session=False)
+        rows = [{side.owner_key.key: owner_id,
+                 'rank': rank,
+                 side.other_key.key: other_id,
+                 'score': score,
+                 'refreshed_at': now}
+                for owner_id in changed
+                for rank, (other_id, score) in enumerate(lists.get(owner_id, []), 1)]
+        if rows:
+            db.session.execute(side.table.__table__.insert(), rows)
+        rewritten.extend(changed)
+    return rewritten
+
+
+def refresh_suggestions(full=False):
+    """ Recompute the suggestion lists that may have changed since the last
+    refresh, or all of them. Returns {model: [ids rewritten]}; the caller
+    commits.
+    """
+    started_at = datetime.utcnow()
+    last = Suggestion_Refresh.query \
+        .filter(Suggestion_Refresh.finished_at.isnot(None)) \
+        .order_by(Suggestion_Refresh.started_at.desc()) \
+        .first()
+    full = full or last is None
+    matcher = Matcher()
+
+    changed = {}
+    for model, side in SIDES.items():
+        if full:
+            # every visible profile, and every stored list
+            changed[model] = set(matcher.profiles[model].positions) | \
+                {record_id for (record_id,) in db.session.query(side.owner_key.distinct())}
+        else:
+            changed[model] = {record_id for (record_id,) in
+                              db.session.query(model.id).filter(model.updated_at >= last.started_at)}
+
+    recompute = {model: set(ids) for model, ids in changed.items()}
+    if not full:
+        for model, side in SIDES.items():
+            recompute[model] |= affected_lists(matcher, model, changed[side.other])
+
+    rewritten = {model: store_lists(model, recompute[model], matcher.top_k(model, recompute[model]),
+                                    started_at)
+                 for model in SIDES}
+    db.session.add(Suggestion_Refresh(full=full, started_at=started_at,
+                                      finished_at=datetime.utcnow(),
+                                      lists_rewritten=sum(map(len, rewritten.values()))))
+    return rewritten
+
+
+def suggestions(model, entity_id):
+    """ The stored list of entity_id, best first, read by primary key. """
+    side = SIDES[model]
+    other = side.other
+    rows = db.session.query(other.id, other.name, other.image_link, other.city, other.state,
+                            side.table.score) \
+        .join(other, other.id == side.other_key) \
+        .filter(side.owner_key == entity_id, visible(other)) \
+        .order_by(side.table.rank) \
+        .all()
+    return [{'id': record_id, 'name': name, 'image_link': image_link,
+             'city': city, 'state': state, 'score': score}
+            for (record_id, name, image_link, city, state, score) in rows]
+
+
+# ----------------------------------------------------------------------------#
+# Commands.
+# ----------------------------------------------------------------------------#
+
+recommendations_cli = AppGroup('recommendations', help='Artist / venue suggestions.')
+
+
+@recommendations_cli.command('refresh')
+@click.option('--full', is_flag=True, help='Recompute every list.')
+@click.option('--watch', type=float, metavar='SECONDS',
+              help='Keep running, refreshing every SECONDS.')
+def refresh_command(full, watch):
+    """Recompute the suggestions of changed profiles. Run from cron, or as a
+    worker with --watch. Cached pages are invalidated with the redis page
+    cache backend only.
+    """
+    while True:
+        start = time.perf_counter()
+        rewritten = refresh_suggestions(full)
+        db.session.commit()
+
+        # only reaches the web workers' cached pages with the shared
+        # PAGE_CACHE_BACKEND = 'redis'; the in-process memory backend lives in
+        # each worker and serves them until PAGE_CACHE_TTL runs out (their
+        # ETags change at once, through refreshed_at)
+        page_cache = current_app.extensions.get('page_cache')
+        if page_cache is not None:
+            page_cache.invalidate(*('{}:{}'.format(model.__name__.lower(), record_id)
+                                    for model, ids in rewritten.items() for record_id in ids))
+        click.echo('Rewrote {} artist and {} venue list(s) in {:.1f}s.'.format(
+            len(rewritten[Artist]), len(rewritten[Venue]), time.perf_counter() - start))
+        if not watch:
+            return
+        full = False
+        db.session.remove()
+        time.sleep(watch)
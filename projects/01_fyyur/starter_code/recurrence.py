@@ -0,0 +1,52 @@
+from datetime import datetime
+from dateutil.rrule import rrule, MONTHLY, WEEKLY
+from Models import db, Show_Table
+from counters import count_bulk_inserted_shows
+
+# ----------------------------------------------------------------------------#
+# Recurring shows.
+#
+# A series is a start time repeated weekly or monthly up to an end date, less
+# any skipped dates. Occurrences are expanded with dateutil's rrule, so a
+# monthly series starting on the 31st skips the months without one (as
+# RFC 5545 does). The series is checked against existing bookings as a
+# whole and inserted with one executemany in one transaction.
+# ----------------------------------------------------------------------------#
+
+FREQUENCIES = {'weekly': WEEKLY, 'monthly': MONTHLY}
+MAX_OCCURRENCES = 260
+
+
+def expand_occurrences(start_time, frequency, until, skip_dates=()):
+    """ Start times of the series: start_time repeated every week or month
+    up to and including the date until, except on skip_dates. At most
+    MAX_OCCURRENCES + 1 are returned, so callers can tell the series is too
+    long.
+    """
+    last = datetime.combine(until, datetime.max.time())
+    skip_dates = set(skip_dates)
+    occurrences = []
+    for start in rrule(FREQUENCIES[frequency], dtstart=start_time, until=last):
+        if start.date() in skip_dates:
+            continue
+        occurrences.append(start)
+        if len(occurrences) > MAX_OCCURRENCES:
+            break
+    return occurrences
+
+
+def create_series(venue_id, artist_id, start_times, now=None):
+    """ Insert a show per start time. Returns the inserted rows; the caller
+    commits.
+    """
+    if now is None:
+        now = datetime.today()
+    shows = [{'venue_id': venue_id,
+              'artist_id': artist_id,
+              'start_time': start_time,
+              # bulk inserts skip the before_insert classification
+              'is_upcoming': start_time >= now}
+             for start_time in start_times]
+    db.session.execute(Show_Table.__table__.insert(), shows)
+    count_bulk_inserted_shows(shows)
+    return shows
@@ -0,0 +1,79 @@
+import time
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state, _EngineConnector
+from sqlalchemy import orm
+
+# ----------------------------------------------------------------------------#
+# Primary / replica routing.
+#
+# With a 'replica' entry in SQLALCHEMY_BINDS, GET and HEAD requests read from
+# the replica and everything else, flushes included, goes to the primary.
+# After a write the client sticks to the primary for REPLICA_STICKY_SECONDS,
+# so the page it is redirected to shows its own change despite replica lag.
+# Without a replica every query goes to the primary, as before.
+# ----------------------------------------------------------------------------#
+
+REPLICA = 'replica'
+READ_METHODS = frozenset(['GET', 'HEAD'])
+STICKY_KEY = '_primary_until'
+
+# QueuePool settings; SQLite's pools take none of them
+QUEUE_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout')
+
+
+def use_primary(view):
+    """ Mark a GET view that must read from the primary. """
+    view.use_primary = True
+    return view
+
+
+class _RoutingEngineConnector(_EngineConnector):
+    """ Applies DATABASE_POOL_OPTIONS['primary' or bind name] to the engine. """
+
+    def get_options(self, sa_url, echo):
+        sa_url, options = super().get_options(sa_url, echo)
+        pool_options = self._app.config.get('DATABASE_POOL_OPTIONS') or {}
+        bind_options = dict(pool_options.get(self._bind or 'primary', {}))
+        if sa_url.get_backend_name() == 'sqlite':
+            for key in QUEUE_POOL_OPTIONS:
+                bind_options.pop(key, None)
+        options.update(bind_options)
+        return sa_url, options
+
+
+class RoutingSession(SignallingSession):
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if not self._flushing and has_request_context() and g.get('db_bind') == REPLICA:
+            return get_state(self.app).db.get_engine(self.app, bind=REPLICA)
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+    def init_app(self, app):
+        super().init_app(app)
+        app.config.setdefault('REPLICA_STICKY_SECONDS', 10)
+        if REPLICA in (app.config.get('SQLALCHEMY_BINDS') or ()):
+            app.before_request(self._choose_bind)
+            app.after_request(self._stick_to_primary)
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def make_connector(self, app=None, bind=None):
+        return _RoutingEngineConnector(self, self.get_app(app), bind)
+
+    @staticmethod
+    def _choose_bind():
+        view = current_app.view_functions.get(request.endpoint)
+        if (request.method in READ_METHODS
+                and not getattr(view, 'use_primary', False)
+                and session.get(STICKY_KEY, 0) < time.time()):
+            g.db_bind = REPLICA
+
+    @staticmethod
+    def _stick_to_primary(response):
+        if request.method not in READ_METHODS:
+            session[STICKY_KEY] = time.time() + current_app.config['REPLICA_STICKY_SECONDS']
+        return response
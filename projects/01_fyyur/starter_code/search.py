@@ -0,0 +1,145 @@
+import math
+from sqlalchemy import DDL, event
+from Models import db, Venue, Artist, visible
+
+# ----------------------------------------------------------------------------#
+# Name search.
+#
+# Postgres: a pg_trgm GIN index serves the ILIKE '%term%' and name % term
+# filters, and similarity() ranks the matches.
+# SQLite: an external-content FTS5 table with the trigram tokenizer, kept in
+# sync by triggers, serves MATCH and bm25() ranks the matches.
+#
+# Both indexes are trigram based, so terms shorter than three characters
+# fall back to a plain ILIKE scan.
+# ----------------------------------------------------------------------------#
+
+PER_PAGE = 20
+MIN_INDEXED_TERM = 3
+MAX_MATCHES = 1000
+
+SQLITE_FTS_DDL = [
+    'CREATE VIRTUAL TABLE IF NOT EXISTS "{fts}" USING fts5('
+    'name, content=\'{table}\', content_rowid=\'id\', tokenize=\'trigram\')',
+    'CREATE TRIGGER IF NOT EXISTS "{fts}_ai" AFTER INSERT ON "{table}" BEGIN '
+    'INSERT INTO "{fts}"(rowid, name) VALUES (new.id, new.name); END',
+    'CREATE TRIGGER IF NOT EXISTS "{fts}_ad" AFTER DELETE ON "{table}" BEGIN '
+    'INSERT INTO "{fts}"("{fts}", rowid, name) VALUES (\'delete\', old.id, old.name); END',
+    'CREATE TRIGGER IF NOT EXISTS "{fts}_au" AFTER UPDATE OF name ON "{table}" BEGIN '
+    'INSERT INTO "{fts}"("{fts}", rowid, name) VALUES (\'delete\', old.id, old.name); '
+    'INSERT INTO "{fts}"(rowid, name) VALUES (new.id, new.name); END',
+    'INSERT INTO "{fts}"("{fts}") VALUES (\'rebuild\')',
+]
+
+POSTGRES_TRGM_DDL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS "ix_{table}_name_trgm" ON "{table}" USING gin (name gin_trgm_ops)',
+]
+
+
+def fts_table_name(model):
+    return model.__tablename__ + '_fts'
+
+
+def search_index_ddl(model, dialect):
+    """ DDL statements that build the name search index of model's table. """
+    statements = {'sqlite': SQLITE_FTS_DDL,
+                  'postgresql': POSTGRES_TRGM_DDL}.get(dialect, [])
+    return [statement.format(table=model.__tablename__, fts=fts_table_name(model))
+            for statement in statements]
+
+
+def _install_search_index(model):
+    table = model.__table__
+    for dialect in ('sqlite', 'postgresql'):
+        for statement in search_index_ddl(model, dialect):
+            event.listen(table, 'after_create', DDL(statement).execute_if(dialect=dialect))
+    event.listen(table, 'before_drop',
+                 DDL('DROP TABLE IF EXISTS "{}"'.format(fts_table_name(model)))
+                 .execute_if(dialect='sqlite'))
+
+
+for _model in (Venue, Artist):
+    _install_search_index(_model)
+
+
+def _like_pattern(search_term):
+    """ ILIKE pattern matching search_term anywhere, taken literally. """
+    escaped = search_term.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+    return '%{}%'.format(escaped)
+
+
+def _candidates(model, search_term, dialect):
+    """ Subquery of (id, rank) for the MAX_MATCHES best matching visible rows;
+    soft-deleted rows are left out before the limit, so they don't use it up.
+    """
+    contains = model.name.ilike(_like_pattern(search_term), escape='!')
+    if len(search_term) < MIN_INDEXED_TERM or dialect not in ('sqlite', 'postgresql'):
+        matches = db.select(model.id.label('id'), db.literal(0).label('rank')) \
+            .where(contains, visible(model)) \
+            .order_by(model.name, model.id)
+    elif dialect == 'postgresql':
+        # both operators are served by the trigram index
+        similarity = db.func.similarity(model.name, search_term)
+        matches = db.select(model.id.label('id'), (-similarity).label('rank')) \
+            .where(db.or_(model.name.op('%')(search_term), contains), visible(model)) \
+            .order_by(similarity.desc(), model.name, model.id)
+    else:
+        # bm25 ranking is only available while scanning the FTS table itself,
+        # so it is read here through the hidden rank column
+        fts = db.table(fts_table_name(model), db.column('rowid'), db.column('rank'))
+        phrase = '"{}"'.format(search_term.replace('"', '""'))
+        matches = db.select(fts.c.rowid.label('id'), fts.c.rank.label('rank')) \
+            .where(db.literal_column(fts.name).op('MATCH')(phrase)) \
+            .order_by(fts.c.rank, fts.c.rowid)
+        deleted_at = getattr(model, 'deleted_at', None)
+        if deleted_at is not None:
+            # few rows, through ix_Venue_deleted_at
+            matches = matches.where(fts.c.rowid.notin_(
+                db.select(model.id).where(deleted_at.isnot(None))))
+    return matches.limit(MAX_MATCHES).subquery()
+
+
+def search_by_name(model, search_term, page=1, per_page=PER_PAGE):
+    """ Ranked, paginated name search over Venue or Artist.
+
+    Matches, the total match count and each row's upcoming show count are
+    fetched in a single statement (plus a count for a page past the end).
+    Only the MAX_MATCHES best ranked index hits are kept and counted, which
+    keeps very broad terms cheap; 'capped' tells the template the count is
+    a lower bound.
+    Returns the dict shape expected by the search_venues / search_artists
+    templates.
+    """
+    search_term = search_term.strip()
+    page = max(page, 1)
+    matches = _candidates(model, search_term, db.engine.dialect.name)
+
+    rows = db.session.query(model.id,
+                            model.name,
+                            model.upcoming_shows_count,
+                            db.func.count().over()) \
+        .join(matches, matches.c.id == model.id) \
+        .order_by(matches.c.rank, model.name, model.id) \
+        .limit(per_page) \
+        .offset((page - 1) * per_page) \
+        .all()
+
+    if rows:
+        count = rows[0][3]
+    elif page > 1:
+        # past the last page: no row to read the window count from
+        count = db.session.query(db.func.count(model.id)) \
+            .join(matches, matches.c.id == model.id) \
+            .scalar()
+    else:
+        count = 0
+    data = [{"id": record_id,
+             "name": name,
+             "num_upcoming_shows": num_upcoming_shows}
+            for (record_id, name, num_upcoming_shows, _) in rows]
+    return {'count': count,
+            'capped': count >= MAX_MATCHES,
+            'data': data,
+            'page': page,
+            'pages': math.ceil(count / per_page)}
@@ -0,0 +1,75 @@
+from datetime import datetime
+from Models import db, Venue, Artist, Show_Table
+
+
+# ----------------------------------------------------------------------------#
+# /shows listing.
+#
+# Keyset pagination on (start_time, id), served by ix_Show_Table_start_time_id.
+# Rows are fetched lazily while the template streams, so a request holds at
+# most one page of rows regardless of the size of Show_Table.
+# ----------------------------------------------------------------------------#
+
+PER_PAGE = 100
+FETCH_SIZE = 25
+
+
+def encode_cursor(start_time, show_id):
+    return '{}_{}'.format(start_time.isoformat(), show_id)
+
+
+def decode_cursor(cursor):
+    """ Returns (start_time, id), or None if the cursor is missing or invalid. """
+    try:
+        start_time, show_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(start_time), int(show_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+class ShowPage:
+    """ One keyset page of /shows rows, fetched while it is iterated.
+
+    next_cursor is only known once iteration is complete, which is the case
+    by the time a template reads it after its for loop.
+    """
+
+    def __init__(self, after=None, per_page=PER_PAGE):
+        self.after = decode_cursor(after)
+        self.per_page = per_page
+        self.next_cursor = None
+
+    def query(self):
+        query = db.session.query(Show_Table.id,
+                                 Show_Table.start_time,
+                                 Show_Table.venue_id,
+                                 Venue.name,
+                                 Show_Table.artist_id,
+                                 Artist.name,
+                                 Artist.image_link) \
+            .join(Venue, Venue.id == Show_Table.venue_id) \
+            .join(Artist, Artist.id == Show_Table.artist_id) \
+            .filter(Show_Table.start_time.isnot(None),
+                    Venue.deleted_at.is_(None))
+        if self.after is not None:
+            query = query.filter(db.tuple_(Show_Table.start_time, Show_Table.id) > self.after)
+        return query \
+            .order_by(Show_Table.start_time, Show_Table.id) \
+            .limit(self.per_page + 1) \
+            .yield_per(FETCH_SIZE)
+
+    def __iter__(self):
+        last = None
+        for n, row in enumerate(self.query()):
+            if n == self.per_page:
+                self.next_cursor = encode_cursor(last.start_time, last.id)
+                break
+            last = row
+            (show_id, start_time, venue_id, venue_name,
+             artist_id, artist_name, artist_image_link) = row
+            yield {"venue_id": venue_id,
+                   "venue_name": venue_name,
+                   "artist_id": artist_id,
+                   "artist_name": artist_name,
+                   "artist_image_link": artist_image_link,
+                   "start_time": start_time}
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import time
+from jinja2 import FileSystemBytecodeCache
+
+# ----------------------------------------------------------------------------#
+# Template compilation.
+#
+# Compiled templates are kept in a bytecode cache on disk (TEMPLATE_CACHE_DIR),
+# shared by every worker on the host, so only the first worker after a
+# template changes pays for compiling it. warm() loads every template into
+# the Jinja environment before the worker takes traffic; it runs at the end
+# of app.py, once all the filters are registered (Jinja 2 checks them at
+# compile time).
+# ----------------------------------------------------------------------------#
+
+
+class AtomicBytecodeCache(FileSystemBytecodeCache):
+    """ Jinja 2 writes cache files in place; a worker reading one that another
+    worker is still writing would fail to unmarshal it. Entries are written
+    to a temporary file and renamed into place instead.
+    """
+
+    def dump_bytecode(self, bucket):
+        fd, temporary = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as stream:
+                bucket.write_bytecode(stream)
+            os.replace(temporary, self._get_cache_filename(bucket))
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+
+class Templates:
+
+    def __init__(self, app=None):
+        self.warmed = []
+        self.warm_seconds = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['templates'] = self
+        app.config.setdefault('TEMPLATE_CACHE_DIR', None)
+        app.config.setdefault('TEMPLATE_WARMUP', True)
+        directory = app.config['TEMPLATE_CACHE_DIR']
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            app.jinja_env.bytecode_cache = AtomicBytecodeCache(directory)
+
+    def warm(self, app):
+        """ Compile (or load from the bytecode cache) every .html template. """
+        start = time.perf_counter()
+        self.warmed = app.jinja_env.list_templates(extensions=['html'])
+        for name in self.warmed:
+            app.jinja_env.get_template(name)
+        self.warm_seconds = time.perf_counter() - start
+        app.logger.info('Loaded %d templates in %.0f ms', len(self.warmed),
+                        self.warm_seconds * 1000)
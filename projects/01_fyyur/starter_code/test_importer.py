@@ -0,0 +1,69 @@
+import csv
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+from app import app
+from Models import db, Venue, Artist, Show_Table
+
+DATABASE_URI = os.environ.get('FYYUR_TEST_DATABASE_URI', 'sqlite:////tmp/fyyur_importer.db')
+
+
+class ImportShowsTestCase(unittest.TestCase):
+    """`flask fyyur import shows` rejects bad rows one by one."""
+
+    def setUp(self):
+        app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URI
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            db.session.add_all([Venue(name='Import Hall', city='City', state='CA'),
+                                Artist(name='Import Band', city='City', state='CA')])
+            db.session.commit()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def run_import(self, lines):
+        path = os.path.join(self.directory.name, 'shows.jsonl')
+        with open(path, 'w') as stream:
+            stream.write('\n'.join(lines) + '\n')
+        result = app.test_cli_runner().invoke(args=['fyyur', 'import', 'shows', path])
+        self.assertIsNone(result.exception, result.output)
+        if not os.path.exists(path + '.errors.csv'):
+            # removed when nothing was rejected
+            return []
+        with open(path + '.errors.csv', newline='') as stream:
+            return list(csv.DictReader(stream))
+
+    def test_utc_offsets(self):
+        errors = self.run_import([
+            '{"venue_id": 1, "artist_id": 1, "start_time": "2030-01-01T20:00"}',
+            '{"venue_id": 1, "artist_id": 1, "start_time": "2030-01-02T20:00+02:00"}',
+            '{"venue_id": 1, "artist_id": 1, "start_time": "2030-01-03T20:00Z"}',
+        ])
+        self.assertEqual(errors, [])
+        with app.app_context():
+            start_times = [start_time for (start_time,) in
+                           db.session.query(Show_Table.start_time).order_by(Show_Table.start_time)]
+        # converted to naive local time
+        expected = datetime(2030, 1, 2, 18, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+        self.assertEqual(len(start_times), 3)
+        self.assertIn(expected, start_times)
+        self.assertTrue(all(start_time.tzinfo is None for start_time in start_times))
+
+    def test_bad_lines(self):
+        errors = self.run_import([
+            '{"venue_id": 1, "artist_id": 1, "start_time": "2030-01-01T20:00"}',
+            '{"venue_id": 1.5, "artist_id": 1, "start_time": "2030-01-02T20:00"}',
+            '{not json',
+            '[]',
+        ])
+        self.assertEqual([(error['line'], error['field']) for error in errors],
+                         [('2', 'venue_id'), ('3', '*'), ('4', '*')])
+        with app.app_context():
+            self.assertEqual(Show_Table.query.count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import os
+import random
+import re
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import app
+from Models import db, Venue, Artist, Show_Table, Genre, venue_genres, artist_genres
+
+# Postgres gives the meaningful plans; SQLite is good enough for a quick run.
+DATABASE_URI = os.environ.get('FYYUR_TEST_DATABASE_URI', 'sqlite:////tmp/fyyur_query_plans.db')
+NUM_VENUES = int(os.environ.get('FYYUR_TEST_NUM_VENUES', 20000))
+NUM_ARTISTS = NUM_VENUES
+SHOWS_PER_VENUE = 5
+
+HOT_TABLES = {'Venue', 'Artist', 'Show_Table', 'Venue_Genre', 'Artist_Genre'}
+
+GENRES = ['Jazz', 'Blues', 'Folk', 'Punk', 'Soul']
+
+
+def sqlite_sequential_scans(connection, statement, parameters):
+    plan = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)
+    # bare 'SCAN <table>' is a full table scan; index and FTS scans name their index
+    return [match.group(1) for match in
+            (re.match(r'SCAN (\S+)$', row[-1]) for row in plan)
+            if match]
+
+
+def postgresql_sequential_scans(connection, statement, parameters):
+    plan = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()
+    scans, nodes = [], [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        if node['Node Type'] == 'Seq Scan':
+            scans.append(node['Relation Name'])
+        nodes.extend(node.get('Plans', []))
+    return scans
+
+
+SEQUENTIAL_SCANS = {'sqlite': sqlite_sequential_scans,
+                    'postgresql': postgresql_sequential_scans}
+
+
+class QueryPlanTestCase(unittest.TestCase):
+    """Fails when a route's queries sequentially scan a hot table."""
+
+    @classmethod
+    def setUpClass(cls):
+        app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URI
+        # the background typeahead build reads whole tables by design, and
+        # would show up in the statements captured from the requests
+        app.config['TYPEAHEAD_WARMUP'] = False
+        cls.client = app.test_client
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            cls.seed()
+
+    @classmethod
+    def seed(cls):
+        rnd = random.Random(0)
+        now = datetime.today()
+
+        db.session.bulk_insert_mappings(Genre, [{'name': name} for name in GENRES])
+        db.session.bulk_insert_mappings(Venue, [
+            {'name': 'Venue Hall {}'.format(n),
+             'city': 'City {}'.format(n % 500),
+             'state': 'CA'}
+            for n in range(NUM_VENUES)])
+        db.session.bulk_insert_mappings(Artist, [
+            {'name': 'Artist Band {}'.format(n), 'city': 'City', 'state': 'CA'}
+            for n in range(NUM_ARTISTS)])
+        db.session.flush()
+
+        genre_ids = [genre.id for genre in Genre.query]
+        db.session.execute(venue_genres.insert(), [
+            {'venue_id': n + 1, 'genre_id': rnd.choice(genre_ids)} for n in range(NUM_VENUES)])
+        db.session.execute(artist_genres.insert(), [
+            {'artist_id': n + 1, 'genre_id': rnd.choice(genre_ids)} for n in range(NUM_ARTISTS)])
+        # each round books every venue and every artist once, rounds 1000
+        # hours apart, so no show conflicts with another
+        for show_round in range(SHOWS_PER_VENUE):
+            artist_ids = list(range(1, NUM_ARTISTS + 1))
+            rnd.shuffle(artist_ids)
+            db.session.bulk_insert_mappings(Show_Table, [
+                {'venue_id': n + 1,
+                 'artist_id': artist_ids[n],
+                 'start_time': now + timedelta(hours=1000 * (show_round - SHOWS_PER_VENUE // 2)
+                                               + rnd.randrange(-400, 400))}
+                for n in range(NUM_VENUES)])
+        db.session.commit()
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+
+    def capture_statements(self, method, url, **kwargs):
+        """ Issue a request and return the SELECT statements it sent. """
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith('SELECT'):
+                statements.append((statement, parameters))
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            response = getattr(self.client(), method)(url, **kwargs)
+            response.get_data()  # drain streamed responses
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        self.assertEqual(response.status_code, 200, url)
+        self.assertTrue(statements, url)
+        return statements
+
+    def assertNoSequentialScans(self, method, url, **kwargs):
+        statements = self.capture_statements(method, url, **kwargs)
+        with app.app_context():
+            connection = db.engine.connect()
+            try:
+                explain = SEQUENTIAL_SCANS[connection.dialect.name]
+                for statement, parameters in statements:
+                    scans = HOT_TABLES.intersection(explain(connection, statement, parameters))
+                    self.assertFalse(scans, 'sequential scan of {} for {} {}:\n{}'.format(
+                        sorted(scans), method.upper(), url, statement))
+            finally:
+                connection.close()
+
+    def test_venue_pages(self):
+        self.assertNoSequentialScans('get', '/venues')
+        self.assertNoSequentialScans('get', '/venues?genre=Jazz')
+        self.assertNoSequentialScans('get', '/venues/42')
+        self.assertNoSequentialScans('get', '/venues/42/edit')
+        self.assertNoSequentialScans('get', '/venues/42/calendar')
+        self.assertNoSequentialScans('get', '/venues/42/calendar?format=ics')
+        self.assertNoSequentialScans('post', '/venues/search', data={'search_term': 'hall 12'})
+        self.assertNoSequentialScans('get', '/venues/near?lat=37.77&lon=-122.42&radius_km=50')
+
+    def test_artist_pages(self):
+        self.assertNoSequentialScans('get', '/artists')
+        self.assertNoSequentialScans('get', '/artists?genre=Jazz')
+        self.assertNoSequentialScans('get', '/artists/42')
+        self.assertNoSequentialScans('get', '/artists/42/edit')
+        self.assertNoSequentialScans('get', '/artists/42/calendar')
+        self.assertNoSequentialScans('post', '/artists/search', data={'search_term': 'band 12'})
+
+    def test_show_pages(self):
+        self.assertNoSequentialScans('get', '/shows')
+        self.assertNoSequentialScans('get', '/shows?after=2026-01-01T00:00:00_1000')
+
+    def test_api(self):
+        self.assertNoSequentialScans('get', '/api/v1/venues?fields=name,genres&include=shows&cursor=40')
+        self.assertNoSequentialScans('get', '/api/v1/venues/42?include=shows')
+        self.assertNoSequentialScans('get', '/api/v1/artists?fields=name&include=shows&cursor=40')
+        self.assertNoSequentialScans('get', '/api/v1/shows?cursor=2026-01-01T00:00:00_1000')
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
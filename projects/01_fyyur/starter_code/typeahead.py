@@ -0,0 +1,206 @@
+import sys
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from Models import db, Venue, Artist, visible
+
+# ----------------------------------------------------------------------------#
+# Typeahead.
+#
+# An in-process prefix index over venue and artist names: a sorted list of
+# normalized keys searched with bisect. Every word start of a name is a key,
+# so 'hop' finds 'The Musical Hop'. A server builds the index in the
+# background as soon as it serves its first request (warm()), so neither
+# that request nor the first /typeahead lookup pays for it, and importing
+# the app (CLI commands, migrations, tests) never touches the database. A
+# lookup made before the build is done waits for it; if the build fails the
+# next lookup retries it. After that the index is kept current by mapper
+# events, applied when the session commits.
+# Each process has its own index; rows written by another process (a bulk
+# import, say) show up after a restart or build().
+# ----------------------------------------------------------------------------#
+
+SEPARATOR = '\x00'
+LIMIT = 10
+
+
+def normalize(name):
+    """ Case-folded, accents stripped, whitespace collapsed. """
+    name = name or ''
+    if not name.isascii():
+        name = ''.join(c for c in unicodedata.normalize('NFKD', name)
+                       if not unicodedata.combining(c))
+    return ' '.join(name.casefold().split())
+
+
+def name_keys(record_id, name):
+    words = normalize(name).split(' ')
+    return [' '.join(words[n:]) + SEPARATOR + str(record_id)
+            for n in range(len(words)) if words[n]]
+
+
+class PrefixIndex:
+
+    def __init__(self):
+        self._keys = []  # sorted 'normalized suffix\x00id'
+        self._names = {}  # id -> display name
+        self._lock = threading.Lock()
+
+    def build(self, rows):
+        """ Replace the contents with (id, name) rows. """
+        names = dict(rows)
+        keys = sorted(key for record_id, name in names.items()
+                      for key in name_keys(record_id, name))
+        with self._lock:
+            self._keys, self._names = keys, names
+
+    def add(self, record_id, name):
+        with self._lock:
+            if self._names.get(record_id) == name:
+                return
+            self._remove(record_id)
+            self._names[record_id] = name
+            for key in name_keys(record_id, name):
+                insort(self._keys, key)
+
+    def remove(self, record_id):
+        with self._lock:
+            self._remove(record_id)
+
+    def _remove(self, record_id):
+        name = self._names.pop(record_id, None)
+        if name is None:
+            return
+        for key in name_keys(record_id, name):
+            position = bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                del self._keys[position]
+
+    def search(self, prefix, limit=LIMIT):
+        """ [{'id', 'name'}] of up to limit names with a word starting with prefix. """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        matches = {}
+        with self._lock:
+            position = bisect_left(self._keys, prefix)
+            keys = self._keys
+            while position < len(keys) and len(matches) < limit:
+                key = keys[position]
+                if not key.startswith(prefix):
+                    break
+                record_id = int(key[key.rindex(SEPARATOR) + 1:])
+                matches.setdefault(record_id, self._names[record_id])
+                position += 1
+        return [{'id': record_id, 'name': name} for record_id, name in matches.items()]
+
+    def __len__(self):
+        return len(self._names)
+
+    def stats(self):
+        with self._lock:
+            key_bytes = sys.getsizeof(self._keys) + sum(map(sys.getsizeof, self._keys))
+            name_bytes = sys.getsizeof(self._names) + sum(
+                sys.getsizeof(record_id) + sys.getsizeof(name)
+                for record_id, name in self._names.items())
+            entries = len(self._names)
+        return {'entries': entries,
+                'keys': len(self._keys),
+                'bytes': key_bytes + name_bytes,
+                'bytes_per_entry': (key_bytes + name_bytes) / entries if entries else None}
+
+
+class Typeahead:
+
+    MODELS = {'venues': Venue, 'artists': Artist}
+
+    def __init__(self, app=None):
+        self.indexes = {kind: PrefixIndex() for kind in self.MODELS}
+        self.built = False
+        self._build_lock = threading.Lock()
+        for kind, model in self.MODELS.items():
+            self._listen(model, self.indexes[kind])
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['typeahead'] = self
+        app.config.setdefault('TYPEAHEAD_WARMUP', True)
+
+        @app.before_first_request
+        def _warm_typeahead():
+            if app.config['TYPEAHEAD_WARMUP'] and not self.built:
+                threading.Thread(target=self.warm, args=(app,), name='typeahead-warm',
+                                 daemon=True).start()
+
+    def build(self):
+        for kind, model in self.MODELS.items():
+            self.indexes[kind].build(db.session.query(model.id, model.name).filter(visible(model)))
+        self.built = True
+
+    def warm(self, app):
+        """ Build the indexes, holding off lookups until they are ready. """
+        start = time.perf_counter()
+        with app.app_context():
+            try:
+                with self._build_lock:
+                    if self.built:
+                        return
+                    self.build()
+            except Exception as error:
+                # the next lookup builds them
+                app.logger.warning('Typeahead index not built in the background: %s',
+                                   str(error).splitlines()[0])
+                return
+        app.logger.info('Built the typeahead indexes (%s) in %.0f ms',
+                        ', '.join('{} {}'.format(len(index), kind)
+                                     for kind, index in self.indexes.items()),
+                        (time.perf_counter() - start) * 1000)
+
+    def search(self, prefix, kinds=None, limit=LIMIT):
+        if not self.built:
+            with self._build_lock:
+                if not self.built:
+                    self.build()
+        return {kind: self.indexes[kind].search(prefix, limit)
+                for kind in (kinds or self.MODELS)}
+
+    def stats(self):
+        return {kind: index.stats() for kind, index in self.indexes.items()}
+
+    def _listen(self, model, index):
+        # mapper events run mid-flush; changes are applied once committed
+        def pending(target):
+            session = object_session(target)
+            return session.info.setdefault('typeahead', []) if session is not None else None
+
+        @event.listens_for(model, 'after_insert')
+        @event.listens_for(model, 'after_update')
+        def _changed(mapper, connection, target):
+            changes = pending(target)
+            if changes is None:
+                return
+            if getattr(target, 'deleted_at', None) is not None:
+                changes.append((index.remove, target.id))
+            else:
+                changes.append((index.add, target.id, target.name))
+
+        @event.listens_for(model, 'after_delete')
+        def _deleted(mapper, connection, target):
+            changes = pending(target)
+            if changes is not None:
+                changes.append((index.remove, target.id))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_changes(session):
+    for change, *args in session.info.pop('typeahead', ()):
+        change(*args)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('typeahead', None)